@@ -0,0 +1,93 @@
+"""
+单个长视频按时间段切块并行处理：每个进程独立打开视频并跳转到自己的时间段，在重叠区预热跟踪器后再拼接结果
+"""
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict
+from pose_estimation import MuayThaiPoseAnalyzer, get_video_info
+from pose_checkpoint import CheckpointedVideoAnalyzer
+
+
+def _analyze_chunk(video_path: str, start_frame: int, end_frame: int, warmup_frames: int,
+                   checkpoint_dir: str = None, model_complexity: int = 2) -> List[Dict]:
+    """Worker entry point: own capture and own MediaPipe model per time range"""
+    if checkpoint_dir:
+        # Each chunk checkpoints its own frame range, so a restarted job resumes every chunk
+        return CheckpointedVideoAnalyzer(checkpoint_dir, model_complexity=model_complexity).extract_range(video_path, start_frame, end_frame,
+                                                                       warmup_frames=warmup_frames)
+    return MuayThaiPoseAnalyzer(model_complexity=model_complexity).analyze_frame_range(video_path, start_frame, end_frame, warmup_frames)
+
+
+class ChunkedVideoAnalyzer:
+    def __init__(self, num_chunks: int = 4, overlap_seconds: float = 1.0, min_chunk_seconds: float = 5.0,
+                 checkpoint_dir: str = None, model_complexity: int = 2):
+        self.num_chunks = num_chunks
+        self.overlap_seconds = overlap_seconds        # tracker warm-up before each chunk
+        self.min_chunk_seconds = min_chunk_seconds    # shorter chunks are not worth a process
+        self.checkpoint_dir = checkpoint_dir          # optional per-chunk checkpoints (see pose_checkpoint.py)
+        self.model_complexity = model_complexity      # pose model tier used by every chunk
+
+    def plan_chunks(self, total_frames: int, fps: float, start_frame: int = 0,
+                    end_frame: int = None) -> List[Dict]:
+        """Split [start_frame, end_frame or total_frames) into contiguous ranges, each with its warm-up length"""
+        span = (end_frame if end_frame is not None else total_frames) - start_frame
+        max_chunks = max(1, int(span / (self.min_chunk_seconds * fps))) if fps else 1
+        num_chunks = max(1, min(self.num_chunks, max_chunks))
+        warmup_frames = int(self.overlap_seconds * fps)
+
+        boundaries = [start_frame + round(i * span / num_chunks) for i in range(num_chunks + 1)]
+        # The reported frame count can be short; without an end frame the last chunk reads until the decoder stops
+        boundaries[-1] = end_frame
+        return [
+            {
+                'start_frame': start,
+                'end_frame': end,
+                'warmup_frames': warmup_frames if start > start_frame else 0
+            }
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+        ]
+
+    def analyze_video(self, video_path: str, start_frame: int = 0, end_frame: int = None) -> Dict:
+        """Same output as MuayThaiPoseAnalyzer.analyze_video, with time ranges processed in parallel"""
+        video_info = get_video_info(video_path)
+        chunks = self.plan_chunks(video_info['total_frames'], video_info['fps'], start_frame, end_frame)
+
+        if len(chunks) == 1:
+            video_info['pose_sequence'] = _analyze_chunk(video_path, start_frame, end_frame, 0,
+                                                         self.checkpoint_dir, self.model_complexity)
+            self._clear_checkpoints(video_path, chunks)
+            return video_info
+
+        with ProcessPoolExecutor(max_workers=len(chunks), mp_context=mp.get_context('spawn')) as executor:
+            futures = [
+                executor.submit(_analyze_chunk, video_path, chunk['start_frame'],
+                                chunk['end_frame'], chunk['warmup_frames'], self.checkpoint_dir,
+                                self.model_complexity)
+                for chunk in chunks
+            ]
+            chunk_results = [future.result() for future in futures]
+        # Only once every chunk has finished; a failed job keeps all chunks' checkpoints for the retry
+        self._clear_checkpoints(video_path, chunks)
+
+        # Frame indices are global already; ranges do not overlap outside their warm-up
+        frames = {}
+        for chunk_result in chunk_results:
+            for frame_data in chunk_result:
+                frames[frame_data['frame']] = frame_data
+        video_info['pose_sequence'] = [frames[frame_idx] for frame_idx in sorted(frames)]
+        video_info['chunks'] = len(chunks)
+        return video_info
+
+    def _clear_checkpoints(self, video_path: str, chunks: List[Dict]):
+        if not self.checkpoint_dir:
+            return
+        checkpointer = CheckpointedVideoAnalyzer(self.checkpoint_dir)
+        if checkpointer.cleanup_on_success:
+            for chunk in chunks:
+                checkpointer.clear(video_path, chunk['start_frame'], chunk['end_frame'])
+
+# Example usage (guarded: spawned chunk workers import this module)
+if __name__ == '__main__':
+    chunked_analyzer = ChunkedVideoAnalyzer()
+    print("Chunked video analyzer initialized!")
+    print("Chunk plan for a 9-minute 30fps video:", chunked_analyzer.plan_chunks(9 * 60 * 30, 30.0))
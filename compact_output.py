@@ -0,0 +1,208 @@
+"""
+紧凑输出格式：只保留关键关节点、坐标量化为整数、字典改为数组，并对时间序列降采样，减小移动端响应体积
+"""
+from typing import Dict, List
+from itertools import accumulate
+import copy
+
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+
+
+class CompactResultEncoder:
+    def __init__(self, key_landmarks: Dict[str, int], coordinate_scale: int = 1000,
+                 max_series_points: int = 60, delta_encode: bool = True):
+        # Keep landmarks ordered by MediaPipe index so clients can rely on a fixed layout
+        ordered = sorted(key_landmarks.items(), key=lambda item: item[1])
+        self.landmark_names = [name for name, _ in ordered]
+        self.landmark_indices = [index for _, index in ordered]
+        self.coordinate_scale = coordinate_scale
+        self.max_series_points = max_series_points
+        self.delta_encode = delta_encode
+
+    def encode(self, analysis_result: Dict) -> Dict:
+        """Convert a full analysis result into the compact format"""
+        if not analysis_result.get('success'):
+            return analysis_result
+
+        compact_result = {key: value for key, value in analysis_result.items()
+                          if key not in ('key_frames', 'detailed_analysis', 'professional_comparison')}
+        compact_result['format'] = 'compact'
+        compact_result['key_frames'] = self.pack_key_frames(analysis_result.get('key_frames', []))
+        if 'professional_comparison' in analysis_result:
+            compact_result['professional_comparison'] = self.pack_professional_comparison(
+                analysis_result['professional_comparison']
+            )
+
+        if 'detailed_analysis' in analysis_result:
+            detailed = copy.copy(analysis_result['detailed_analysis'])
+            form_details = dict(detailed.get('form_details', {}))
+            if 'frame_scores' in form_details:
+                form_details['frame_scores'] = self.downsample_series(form_details['frame_scores'])
+            detailed['form_details'] = form_details
+            compact_result['detailed_analysis'] = detailed
+
+        return compact_result
+
+    def pack_landmarks(self, landmarks: List[Dict]) -> List[int]:
+        """Flatten the tracked landmarks into [x, y, z, visibility, ...] quantized integers"""
+        packed = []
+        for index in self.landmark_indices:
+            landmark = landmarks[index]
+            for field in LANDMARK_FIELDS:
+                packed.append(int(round(landmark[field] * self.coordinate_scale)))
+        return packed
+
+    def pack_key_frames(self, key_frames: List[Dict]) -> Dict:
+        """Pack key frames into parallel arrays, optionally delta-encoded against the previous frame"""
+        frame_indices = []
+        timestamps = []
+        events = []
+        landmark_rows = []
+        previous = None
+
+        for frame in key_frames:
+            frame_indices.append(frame['frame_index'])
+            timestamps.append(round(frame['timestamp'], 3))
+            # Which motion event the frame shows (None for the fixed-position fallback)
+            events.append(frame.get('event'))
+
+            if len(frame['landmarks']) <= max(self.landmark_indices):
+                landmark_rows.append([])
+                previous = None
+                continue
+
+            packed = self.pack_landmarks(frame['landmarks'])
+            if self.delta_encode and previous is not None:
+                landmark_rows.append([curr - prev for curr, prev in zip(packed, previous)])
+            else:
+                landmark_rows.append(packed)
+            previous = packed
+
+        return {
+            'landmark_names': self.landmark_names,
+            'fields': list(LANDMARK_FIELDS),
+            'scale': self.coordinate_scale,
+            'delta_encoded': self.delta_encode,
+            'frame_indices': frame_indices,
+            'timestamps': timestamps,
+            'events': events,
+            'landmarks': landmark_rows
+        }
+
+    def pack_professional_comparison(self, comparison: Dict) -> Dict:
+        """Pack DTW alignments into delta-encoded frame arrays and deviations into whole degrees"""
+        packed_matches = []
+        deviation_fields = []
+        for match in comparison.get('matches', []):
+            deviation_fields = list(match['mean_deviation'])
+            user_frames = [pair['user_frame'] for pair in match['alignment']]
+            reference_frames = [pair['reference_frame'] for pair in match['alignment']]
+            packed_matches.append({
+                'metadata': match['metadata'],
+                'dtw_distance': match['dtw_distance'],
+                'mean_deviation': match['mean_deviation'],
+                'user_frames': self._delta_encode(user_frames),
+                'reference_frames': self._delta_encode(reference_frames),
+                'frame_deviations': self._pack_deviations(match['frame_deviations'])
+            })
+        return {**comparison, 'delta_encoded': self.delta_encode, 'deviation_fields': deviation_fields,
+                'matches': packed_matches}
+
+    def _pack_deviations(self, frame_deviations: List[List[float]]) -> List[int]:
+        """Row-major [path length x joints] in whole degrees, each joint delta-encoded along the path"""
+        rows = [[int(round(value)) for value in row] for row in frame_deviations]
+        if self.delta_encode:
+            rows = rows[:1] + [[curr - prev for curr, prev in zip(row, previous)]
+                               for row, previous in zip(rows[1:], rows[:-1])]
+        return [value for row in rows for value in row]
+
+    def _delta_encode(self, values: List[int]) -> List[int]:
+        if not self.delta_encode or not values:
+            return list(values)
+        return [values[0]] + [curr - prev for curr, prev in zip(values[1:], values[:-1])]
+
+    def downsample_series(self, values: List[float]) -> List[float]:
+        """Average a per-frame series into at most max_series_points buckets"""
+        if len(values) <= self.max_series_points:
+            return [round(float(value), 1) for value in values]
+
+        bucket_size = len(values) / self.max_series_points
+        downsampled = []
+        for bucket in range(self.max_series_points):
+            start = int(bucket * bucket_size)
+            end = int((bucket + 1) * bucket_size)
+            bucket_values = values[start:end]
+            downsampled.append(round(float(sum(bucket_values)) / len(bucket_values), 1))
+        return downsampled
+
+
+def unpack_key_frames(packed_key_frames: Dict) -> List[Dict]:
+    """Rebuild key frame landmark dicts from the compact format (reference decoder for clients)"""
+    fields = packed_key_frames['fields']
+    names = packed_key_frames['landmark_names']
+    scale = packed_key_frames['scale']
+    stride = len(fields)
+
+    # Older payloads have no event labels
+    events = packed_key_frames.get('events', [None] * len(packed_key_frames['frame_indices']))
+
+    key_frames = []
+    previous = None
+    for frame_index, timestamp, event, row in zip(packed_key_frames['frame_indices'],
+                                                  packed_key_frames['timestamps'],
+                                                  events,
+                                                  packed_key_frames['landmarks']):
+        if not row:
+            previous = None
+            key_frames.append({'frame_index': frame_index, 'timestamp': timestamp, 'event': event,
+                               'landmarks': {}})
+            continue
+
+        if packed_key_frames['delta_encoded'] and previous is not None:
+            row = [delta + prev for delta, prev in zip(row, previous)]
+        previous = row
+
+        landmarks = {}
+        for position, name in enumerate(names):
+            values = row[position * stride:(position + 1) * stride]
+            landmarks[name] = {field: value / scale for field, value in zip(fields, values)}
+        key_frames.append({'frame_index': frame_index, 'timestamp': timestamp, 'event': event,
+                           'landmarks': landmarks})
+
+    return key_frames
+
+def unpack_professional_comparison(packed_comparison: Dict) -> Dict:
+    """Rebuild alignment pairs and per-frame deviation rows from the compact format"""
+    matches = []
+    for match in packed_comparison['matches']:
+        user_frames, reference_frames = match['user_frames'], match['reference_frames']
+        if packed_comparison['delta_encoded']:
+            user_frames = list(accumulate(user_frames))
+            reference_frames = list(accumulate(reference_frames))
+        stride = len(packed_comparison['deviation_fields'])
+        deviations = match['frame_deviations']
+        rows = [deviations[start:start + stride] for start in range(0, len(deviations), stride)]
+        if packed_comparison['delta_encoded']:
+            rows = [list(row) for row in accumulate(rows, lambda prev, row: [p + d for p, d in zip(prev, row)])]
+        matches.append({
+            'metadata': match['metadata'],
+            'dtw_distance': match['dtw_distance'],
+            'mean_deviation': match['mean_deviation'],
+            'alignment': [{'user_frame': user_frame, 'reference_frame': reference_frame}
+                          for user_frame, reference_frame in zip(user_frames, reference_frames)],
+            'frame_deviations': rows
+        })
+    comparison = {key: value for key, value in packed_comparison.items()
+                  if key not in ('delta_encoded', 'deviation_fields')}
+    comparison['matches'] = matches
+    return comparison
+
+# Example usage
+compact_encoder = CompactResultEncoder({'nose': 0, 'left_wrist': 15, 'right_wrist': 16})
+demo_landmarks = [{'x': 0.5, 'y': 0.5, 'z': -0.1, 'visibility': 0.99}] * 33
+demo_packed = compact_encoder.pack_key_frames([
+    {'frame_index': 0, 'timestamp': 0.0, 'event': 'guard', 'landmarks': demo_landmarks},
+    {'frame_index': 10, 'timestamp': 0.333, 'event': 'start_of_motion', 'landmarks': demo_landmarks}
+])
+print("Compact encoder initialized!")
+print("Packed key frame rows:", demo_packed['landmarks'])
@@ -1,6 +1,7 @@
 """
 真实数据验证和质量控制管道
 """
+import numpy as np
 
 class DataValidationPipeline:
     def __init__(self):
@@ -22,8 +23,14 @@ class DataValidationPipeline:
         if video_metadata["fps"] < self.quality_thresholds["fps_min"]:
             issues.append("帧率过低")
         
+        # 过长的视频只要检测到的动作窗口时长合适就裁剪，而不是拒绝
+        duration = video_metadata["duration"]
+        active_window = video_metadata.get("active_window")
+        if active_window and duration > self.quality_thresholds["duration_range"][1]:
+            duration = active_window["end_time"] - active_window["start_time"]
+        
         if not (self.quality_thresholds["duration_range"][0] <= 
-                video_metadata["duration"] <= 
+                duration <= 
                 self.quality_thresholds["duration_range"][1]):
             issues.append("视频时长不合适")
         
@@ -82,6 +89,12 @@ print(f"视频质量验证: {'通过' if is_valid else '失败'}")
 if issues:
     print(f"问题: {', '.join(issues)}")
 
+# 过长的手机上传视频：按检测到的动作窗口裁剪
+long_upload = dict(video_meta, duration=42.0,
+                   active_window={"start_time": 18.5, "end_time": 24.0})
+is_valid, issues = validator.validate_video_quality(long_upload)
+print(f"裁剪后视频质量验证: {'通过' if is_valid else '失败'}")
+
 print("\n=== 真实实现需要解决的数据质量问题 ===")
 print("1. 视频质量标准化")
 print("2. 姿势检测准确性验证") 
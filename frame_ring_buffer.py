@@ -0,0 +1,184 @@
+"""
+解码进程与姿势估计进程之间的共享内存帧环形缓冲区：帧只解码一次写入预分配槽位，进程间只传递槽位编号
+"""
+import cv2
+import numpy as np
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+from pose_estimation import MuayThaiPoseAnalyzer
+
+STOP = -1
+
+
+class SharedFrameRingBuffer:
+    def __init__(self, num_slots: int, frame_shape: Tuple[int, int, int], name: str = None):
+        self.num_slots = num_slots
+        self.frame_shape = frame_shape
+        size = num_slots * int(np.prod(frame_shape))
+
+        # The creator allocates the block; other processes attach to it by name
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.slots = np.ndarray((num_slots, *frame_shape), dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        # Drop the numpy view first, SharedMemory refuses to close while it is exported
+        del self.slots
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _decode_frames(video_path: str, buffer_name: str, num_slots: int, frame_shape: Tuple[int, int, int],
+                   free_slots, filled_slots, num_workers: int, start_frame: int = 0, end_frame: int = None):
+    """Decoder process: read frames straight into free slots and convert them to RGB in place"""
+    ring = SharedFrameRingBuffer(num_slots, frame_shape, name=buffer_name)
+    cap = cv2.VideoCapture(video_path)
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    # Some codecs can only seek to key frames; trust the position the decoder reports
+    frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    target = frame = None
+    try:
+        while cap.isOpened() and (end_frame is None or frame_idx < end_frame):
+            slot = free_slots.get()
+            target = ring.slots[slot]
+            ret, frame = cap.read(target)
+            if not ret:
+                free_slots.put(slot)
+                break
+            if frame_idx < start_frame:
+                # Landed on an earlier key frame; these frames are outside the requested range
+                free_slots.put(slot)
+                frame_idx += 1
+                continue
+            if not np.shares_memory(frame, target):
+                # Decoder returned a differently shaped frame; fall back to a copy
+                target[...] = cv2.resize(frame, (frame_shape[1], frame_shape[0]))
+            cv2.cvtColor(target, cv2.COLOR_BGR2RGB, dst=target)
+            filled_slots.put((slot, frame_idx))
+            frame_idx += 1
+    finally:
+        cap.release()
+        for _ in range(num_workers):
+            filled_slots.put((STOP, frame_idx))
+        # Views into the shared block must be released before it can be closed
+        target = frame = None
+        ring.close()
+
+
+def _estimate_poses(buffer_name: str, num_slots: int, frame_shape: Tuple[int, int, int],
+                    free_slots, filled_slots, results, model_complexity: int = 2):
+    """Pose worker process: run MediaPipe on frames in place and hand the slot back"""
+    ring = SharedFrameRingBuffer(num_slots, frame_shape, name=buffer_name)
+    # Workers share one queue, so each sees frames out of order (e.g. i, i+3, i+5);
+    # tracking and temporal smoothing would blend unrelated frames, so detect per frame
+    analyzer = MuayThaiPoseAnalyzer(model_complexity=model_complexity, static_image_mode=True)
+    try:
+        while True:
+            slot, frame_idx = filled_slots.get()
+            if slot == STOP:
+                break
+            landmarks = analyzer.extract_pose_from_rgb(ring.slots[slot])
+            free_slots.put(slot)
+            if landmarks:
+                results.put((frame_idx, landmarks))
+    finally:
+        results.put((STOP, None))
+        ring.close()
+
+
+class ParallelPoseExtractor:
+    def __init__(self, num_workers: int = 4, num_slots: int = None, result_timeout: float = 30.0,
+                 model_complexity: int = 2):
+        self.num_workers = num_workers
+        self.model_complexity = model_complexity    # pose model tier used by every worker
+        # Enough slots for every worker to hold one frame while the decoder fills the next ones
+        self.num_slots = num_slots or 2 * num_workers + 2
+        self.result_timeout = result_timeout
+        self.context = mp.get_context('spawn')
+
+    def analyze_video(self, video_path: str, start_frame: int = 0, end_frame: int = None) -> Dict:
+        """Same output as MuayThaiPoseAnalyzer.analyze_video, using one decoder and several pose workers
+
+        Frames are detected independently, without MediaPipe's temporal smoothing; use LandmarkSmoother
+        """
+        cap = cv2.VideoCapture(video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        frame_shape = (height, width, 3)
+        ring = SharedFrameRingBuffer(self.num_slots, frame_shape)
+        free_slots = self.context.Queue()
+        filled_slots = self.context.Queue()
+        results = self.context.Queue()
+        for slot in range(self.num_slots):
+            free_slots.put(slot)
+
+        decoder = self.context.Process(
+            target=_decode_frames,
+            args=(video_path, ring.name, self.num_slots, frame_shape, free_slots, filled_slots, self.num_workers,
+                  start_frame, end_frame)
+        )
+        workers = [
+            self.context.Process(
+                target=_estimate_poses,
+                args=(ring.name, self.num_slots, frame_shape, free_slots, filled_slots, results,
+                      self.model_complexity)
+            )
+            for _ in range(self.num_workers)
+        ]
+
+        landmarks_by_frame = {}
+        try:
+            decoder.start()
+            for worker in workers:
+                worker.start()
+
+            finished_workers = 0
+            while finished_workers < self.num_workers:
+                try:
+                    frame_idx, landmarks = results.get(timeout=self.result_timeout)
+                except queue.Empty:
+                    # A killed decoder never sends STOP, leaving the workers blocked on the queue
+                    if not decoder.is_alive() and decoder.exitcode != 0:
+                        raise RuntimeError(f'Frame decoder process died (exit code {decoder.exitcode})')
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError('Pose worker processes exited without finishing')
+                    continue
+                if frame_idx == STOP:
+                    finished_workers += 1
+                else:
+                    landmarks_by_frame[frame_idx] = landmarks
+        finally:
+            for process in [decoder, *workers]:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            ring.close()
+
+        pose_data = [
+            {
+                'frame': frame_idx,
+                'timestamp': frame_idx / fps,
+                'landmarks': landmarks_by_frame[frame_idx]
+            }
+            for frame_idx in sorted(landmarks_by_frame)
+        ]
+
+        return {
+            'total_frames': frame_count,
+            'fps': fps,
+            'duration': frame_count / fps,
+            'resolution': (width, height),
+            'pose_sequence': pose_data
+        }
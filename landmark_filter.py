@@ -0,0 +1,89 @@
+"""
+关节点时序平滑与短缺口插值：在均匀时间网格上补齐漏检帧，并用按可见度加权的 Savitzky-Golay 局部多项式拟合去除抖动
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict
+from pose_arrays import sequence_to_array, array_to_sequence
+
+
+class LandmarkSmoother:
+    def __init__(self, max_gap_frames: int = 5, window_length: int = 5, polyorder: int = 2,
+                 min_visibility_weight: float = 0.05):
+        self.max_gap_frames = max_gap_frames    # longer gaps split the sequence into segments
+        self.window_length = window_length      # frames, odd
+        self.polyorder = polyorder
+        self.min_visibility_weight = min_visibility_weight
+
+    def process(self, pose_sequence: List[Dict], fps: float) -> List[Dict]:
+        """Fill short gaps on the frame grid and smooth landmark coordinates"""
+        frame_indices, timestamps, landmarks = sequence_to_array(pose_sequence)
+        if len(frame_indices) < 2 or not fps:
+            return pose_sequence
+
+        grid, filled, interpolated, segment_starts = self.fill_gaps(frame_indices, landmarks)
+        smoothed = self.savgol_filter(filled, segment_starts)
+
+        result = array_to_sequence(grid, grid / fps, smoothed)
+        for frame_data, was_interpolated in zip(result, interpolated.tolist()):
+            if was_interpolated:
+                frame_data['interpolated'] = True
+        return result
+
+    def fill_gaps(self, frame_indices: np.ndarray, landmarks: np.ndarray):
+        """Linearly interpolate missing frames in gaps of at most max_gap_frames"""
+        grid = np.arange(frame_indices[0], frame_indices[-1] + 1)
+
+        # Neighbouring observed frames for every grid position
+        upper = np.clip(np.searchsorted(frame_indices, grid), 1, len(frame_indices) - 1)
+        lower = upper - 1
+        span = frame_indices[upper] - frame_indices[lower]
+        weight = ((grid - frame_indices[lower]) / span)[:, None, None]
+        filled = landmarks[lower] * (1 - weight) + landmarks[upper] * weight
+
+        observed = np.zeros(len(grid), dtype=bool)
+        observed[frame_indices - grid[0]] = True
+        keep = observed | (span - 1 <= self.max_gap_frames)
+
+        # A dropped long gap starts a new segment so the filter does not smooth across it
+        kept_positions = np.flatnonzero(keep)
+        segment_starts = np.concatenate([[True], np.diff(grid[kept_positions]) > 1])
+
+        return grid[keep], filled[keep], ~observed[keep], segment_starts
+
+    def savgol_filter(self, landmarks: np.ndarray, segment_starts: np.ndarray) -> np.ndarray:
+        """Visibility-weighted Savitzky-Golay smoothing of x/y/z, one segment at a time"""
+        smoothed = landmarks.copy()
+        boundaries = np.concatenate([np.flatnonzero(segment_starts), [len(landmarks)]])
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            if end - start >= self.window_length:
+                smoothed[start:end, :, :3] = self._weighted_savgol(landmarks[start:end])
+        return smoothed
+
+    def _weighted_savgol(self, landmarks: np.ndarray) -> np.ndarray:
+        """Fit a weighted local polynomial around every frame and take its value at the center"""
+        half = self.window_length // 2
+        offsets = np.arange(-half, half + 1, dtype=np.float64)
+        powers = offsets[None, :] ** np.arange(2 * self.polyorder + 1)[:, None]
+
+        # Frames outside the segment get zero weight, so edges use a one-sided fit
+        weights = np.clip(landmarks[:, :, 3], self.min_visibility_weight, 1.0)
+        weights = np.pad(weights, ((half, half), (0, 0)))
+        coords = np.pad(landmarks[:, :, :3], ((half, half), (0, 0), (0, 0)))
+        weight_windows = sliding_window_view(weights, self.window_length, axis=0)
+        weighted_windows = sliding_window_view(coords * weights[:, :, None], self.window_length, axis=0)
+
+        # Normal equations of the weighted least-squares fit, built from windowed moments
+        moments = np.einsum('tlw,jw->tlj', weight_windows, powers)
+        order = self.polyorder + 1
+        normal_matrix = moments[:, :, np.add.outer(np.arange(order), np.arange(order))]
+        normal_matrix += np.eye(order) * 1e-9
+        rhs = np.einsum('tlcw,jw->tljc', weighted_windows, powers[:order])
+
+        coefficients = np.linalg.solve(normal_matrix, rhs)
+        return coefficients[:, :, 0, :]
+
+# Example usage
+landmark_smoother = LandmarkSmoother()
+print("Landmark smoother initialized!")
+print("Max interpolated gap (frames):", landmark_smoother.max_gap_frames)
@@ -1,22 +1,111 @@
 from pose_estimation import MuayThaiPoseAnalyzer
 from technique_classifier import TechniqueClassifier
 from scoring_engine import MuayThaiScoringEngine
+from result_store import AnalysisResultStore
+from compact_output import CompactResultEncoder
+from motion_events import MotionEventDetector, KEY_EVENTS
+from landmark_filter import LandmarkSmoother
+from multi_view_fusion import MultiViewFusion
+from reference_index import ReferenceRepetitionIndex
+from frame_ring_buffer import ParallelPoseExtractor
+from chunked_video import ChunkedVideoAnalyzer
+from model_tiers import LatencyBudgetedAnalyzer, MODEL_TIERS
+from real_reference_poses import RealReferencePoses
+from active_window import ActiveWindowDetector
+from stance_normalizer import StanceNormalizer
+from pose_checkpoint import CheckpointedVideoAnalyzer
 import json
 
 class MuayThaiAnalysisPipeline:
-    def __init__(self):
-        self.pose_analyzer = MuayThaiPoseAnalyzer()
+    def __init__(self, result_store: AnalysisResultStore = None, landmark_smoother: LandmarkSmoother = None,
+                 reference_index: ReferenceRepetitionIndex = None, pose_workers: int = 1,
+                 video_chunks: int = 1, latency_budget: LatencyBudgetedAnalyzer = None,
+                 standards_path: str = None, active_window: ActiveWindowDetector = None,
+                 checkpoint_dir: str = None, model_complexity: int = 2):
+        # Pose model tier for every extractor: 0 lite, 1 full, 2 heavy; latency_budget picks it automatically
+        if model_complexity not in MODEL_TIERS:
+            raise ValueError(f'model_complexity must be one of {sorted(MODEL_TIERS)}')
+        if latency_budget is not None and model_complexity != MODEL_TIERS[0]:
+            raise ValueError('latency_budget selects the model tier itself; do not set model_complexity as well')
+        # Only one extractor runs per video; checkpointing composes with chunking (one checkpoint per chunk)
+        if pose_workers > 1 and video_chunks > 1:
+            raise ValueError('pose_workers and video_chunks cannot be combined; choose one')
+        if latency_budget is not None and (pose_workers > 1 or video_chunks > 1):
+            raise ValueError('latency_budget cannot be combined with pose_workers or video_chunks')
+        if checkpoint_dir and (pose_workers > 1 or latency_budget is not None):
+            raise ValueError('checkpoint_dir can only be combined with video_chunks')
+        
+        self.pose_analyzer = MuayThaiPoseAnalyzer(model_complexity=model_complexity)
+        # Several pose worker processes share decoded frames through a shared-memory ring buffer
+        self.parallel_extractor = (ParallelPoseExtractor(pose_workers, model_complexity=model_complexity)
+                                   if pose_workers > 1 else None)
+        # Long videos can instead be split into time ranges analyzed by separate processes
+        self.chunked_analyzer = (ChunkedVideoAnalyzer(video_chunks, checkpoint_dir=checkpoint_dir,
+                                                      model_complexity=model_complexity)
+                                 if video_chunks > 1 else None)
+        # Or pick the pose model tier at runtime to meet a target fps / job deadline
+        self.latency_budget = latency_budget
+        # Optional pre-pass that trims setup / dead footage before full pose extraction
+        self.active_window = active_window
+        # Long uploads can checkpoint extracted poses to disk and resume after a worker restart
+        self.checkpointed_analyzer = (CheckpointedVideoAnalyzer(checkpoint_dir, model_complexity=model_complexity)
+                                      if checkpoint_dir and self.chunked_analyzer is None else None)
         self.technique_classifier = TechniqueClassifier()
-        self.scoring_engine = MuayThaiScoringEngine()
+        # Form thresholds and timing standards come from a built standards file when one is given
+        reference_standards = RealReferencePoses(standards_path)
+        self.scoring_engine = MuayThaiScoringEngine(reference_index,
+                                                    reference_standards if standards_path else None)
+        self.motion_detector = MotionEventDetector(reference_standards)
+        self.result_store = result_store
+        self.landmark_smoother = landmark_smoother
+        self.stance_normalizer = StanceNormalizer()
+        self.view_fusion = MultiViewFusion(model_complexity=model_complexity)
+        self.compact_encoder = CompactResultEncoder(self.pose_analyzer.key_landmarks)
     
-    def analyze_technique_video(self, video_path: str, user_technique_hint: str = None) -> dict:
+    def analyze_technique_video(self, video_path: str, user_technique_hint: str = None,
+                                user_id: str = None, compact_output: bool = False) -> dict:
         """Complete analysis pipeline for a Muay Thai technique video"""
         print(f"Starting analysis of video: {video_path}")
         
         # Step 1: Extract pose data from video
         print("Step 1: Extracting pose data...")
-        pose_data = self.pose_analyzer.analyze_video(video_path)
+        window = self.active_window.detect(video_path) if self.active_window is not None else None
+        start_frame, end_frame = 0, None
+        if window is not None and window['trimmed']:
+            # Every extractor seeks straight to the active window
+            print(f"Active window: {window['start_time']:.1f}s - {window['end_time']:.1f}s")
+            start_frame, end_frame = window['start_frame'], window['end_frame']
+        
+        if self.chunked_analyzer is not None:
+            pose_data = self.chunked_analyzer.analyze_video(video_path, start_frame, end_frame)
+        elif self.parallel_extractor is not None:
+            pose_data = self.parallel_extractor.analyze_video(video_path, start_frame, end_frame)
+        elif self.latency_budget is not None:
+            pose_data = self.latency_budget.analyze_video(video_path, start_frame, end_frame)
+        elif self.checkpointed_analyzer is not None:
+            pose_data = self.checkpointed_analyzer.analyze_video(video_path, start_frame, end_frame)
+        else:
+            pose_data = self.pose_analyzer.analyze_video(video_path, start_frame, end_frame)
+        if window is not None and window['trimmed']:
+            pose_data['active_window'] = window
+        
+        return self.analyze_pose_data(pose_data, user_technique_hint, user_id, compact_output)
+    
+    def analyze_multi_view_video(self, video_paths: dict, user_technique_hint: str = None,
+                                 user_id: str = None, compact_output: bool = False) -> dict:
+        """Analyze one repetition recorded from several camera angles, e.g. {'front': ..., 'side': ...}"""
+        print(f"Starting multi-view analysis of {len(video_paths)} videos: {list(video_paths)}")
         
+        # Step 1: Extract pose data from all views in parallel and fuse them
+        print("Step 1: Extracting and fusing pose data...")
+        pose_data = self.view_fusion.extract_and_fuse(video_paths)
+        print(f"Fused views: {pose_data['views']}")
+        
+        return self.analyze_pose_data(pose_data, user_technique_hint, user_id, compact_output)
+    
+    def analyze_pose_data(self, pose_data: dict, user_technique_hint: str = None,
+                          user_id: str = None, compact_output: bool = False) -> dict:
+        """Classify, score and package already extracted pose data"""
         if not pose_data['pose_sequence']:
             return {
                 'error': 'No pose data could be extracted from video',
@@ -25,15 +114,24 @@ class MuayThaiAnalysisPipeline:
         
         print(f"Extracted {len(pose_data['pose_sequence'])} frames of pose data")
         
+        # Optional: fill short detection gaps and remove landmark jitter before scoring
+        if self.landmark_smoother is not None:
+            pose_data['pose_sequence'] = self.landmark_smoother.process(
+                pose_data['pose_sequence'], pose_data['fps']
+            )
+        
+        # Mirror southpaw sequences once so classification and scoring see one orientation;
+        # key frames keep the original landmarks for drawing over the video
+        canonical_sequence, stance = self.stance_normalizer.normalize(pose_data['pose_sequence'])
+        print(f"Detected stance: {stance}")
+        
         # Step 2: Classify technique
         print("Step 2: Classifying technique...")
         if user_technique_hint:
             technique = user_technique_hint
             confidence = 1.0
         else:
-            technique, confidence = self.technique_classifier.predict_technique(
-                pose_data['pose_sequence']
-            )
+            technique, confidence = self.technique_classifier.predict_technique(canonical_sequence)
         
         print(f"Detected technique: {technique} (confidence: {confidence:.2f})")
         
@@ -41,19 +139,16 @@ class MuayThaiAnalysisPipeline:
         print("Step 3: Scoring technique...")
         
         # Form analysis
-        form_result = self.scoring_engine.calculate_form_score(
-            pose_data['pose_sequence'], technique
-        )
+        form_result = self.scoring_engine.calculate_form_score(canonical_sequence, technique)
         
         # Chain of power analysis
-        power_result = self.scoring_engine.calculate_chain_of_power_score(
-            pose_data['pose_sequence'], technique
-        )
+        power_result = self.scoring_engine.calculate_chain_of_power_score(canonical_sequence, technique)
         
         # Explosiveness analysis
-        explosiveness_result = self.scoring_engine.calculate_explosiveness_score(
-            pose_data['pose_sequence']
-        )
+        explosiveness_result = self.scoring_engine.calculate_explosiveness_score(canonical_sequence, technique)
+        
+        # Comparison with the closest professional repetitions
+        professional_comparison = self.scoring_engine.compare_to_professionals(canonical_sequence, technique)
         
         # Calculate overall score
         overall_score = (
@@ -64,7 +159,8 @@ class MuayThaiAnalysisPipeline:
         
         # Step 4: Generate key frames for comparison
         print("Step 4: Extracting key frames...")
-        key_frames = self._extract_key_frames(pose_data['pose_sequence'])
+        motion_events = self.motion_detector.detect_events(pose_data['pose_sequence'], technique)
+        key_frames = self._extract_key_frames(pose_data['pose_sequence'], motion_events)
         
         # Step 5: Compile results
         analysis_result = {
@@ -72,11 +168,14 @@ class MuayThaiAnalysisPipeline:
             'video_info': {
                 'duration': pose_data['duration'],
                 'total_frames': pose_data['total_frames'],
-                'fps': pose_data['fps']
+                'fps': pose_data['fps'],
+                'views': pose_data.get('views', []),
+                'active_window': pose_data.get('active_window')
             },
             'technique': {
                 'name': technique,
-                'confidence': confidence
+                'confidence': confidence,
+                'stance': stance
             },
             'scores': {
                 'overall': round(overall_score),
@@ -90,6 +189,8 @@ class MuayThaiAnalysisPipeline:
                 'explosiveness': explosiveness_result['feedback']
             },
             'key_frames': key_frames,
+            'motion_analysis': motion_events,
+            'professional_comparison': professional_comparison,
             'detailed_analysis': {
                 'form_details': form_result,
                 'power_details': power_result,
@@ -97,31 +198,49 @@ class MuayThaiAnalysisPipeline:
             }
         }
         
+        # Step 6: Persist result for progress tracking
+        if self.result_store is not None and user_id is not None:
+            analysis_result['result_id'] = self.result_store.save_result(user_id, analysis_result)
+        
+        # Step 7: Shrink payload for mobile clients
+        if compact_output:
+            analysis_result = self.compact_encoder.encode(analysis_result)
+        
         print("Analysis complete!")
         return analysis_result
     
-    def _extract_key_frames(self, pose_sequence: list) -> list:
+    def _extract_key_frames(self, pose_sequence: list, motion_events: dict = None) -> list:
         """Extract key frames for visual comparison"""
         if len(pose_sequence) < 4:
             return []
         
-        # Extract frames at key moments
-        total_frames = len(pose_sequence)
-        key_frame_indices = [
-            0,  # Starting position
-            total_frames // 4,  # 25% through
-            total_frames // 2,  # Peak/impact point
-            3 * total_frames // 4,  # 75% through
-            total_frames - 1  # End position
-        ]
+        if motion_events:
+            # Key moments detected from the striking limb's kinematics
+            position_by_frame = {frame_data['frame']: i for i, frame_data in enumerate(pose_sequence)}
+            key_frame_indices = [
+                position_by_frame[motion_events['events'][event]['frame']] for event in KEY_EVENTS
+            ]
+            event_labels = KEY_EVENTS
+        else:
+            # No clear strike found, fall back to fixed positions in the clip
+            total_frames = len(pose_sequence)
+            key_frame_indices = [
+                0,  # Starting position
+                total_frames // 4,  # 25% through
+                total_frames // 2,  # Midpoint
+                3 * total_frames // 4,  # 75% through
+                total_frames - 1  # End position
+            ]
+            event_labels = [None] * len(key_frame_indices)
         
         key_frames = []
-        for idx in key_frame_indices:
+        for idx, event in zip(key_frame_indices, event_labels):
             if idx < len(pose_sequence):
                 frame_data = pose_sequence[idx]
                 key_frames.append({
                     'frame_index': idx,
                     'timestamp': frame_data['timestamp'],
+                    'event': event,
                     'landmarks': frame_data['landmarks']
                 })
         
@@ -169,7 +288,8 @@ def demo_analysis():
     
     return mock_result
 
-# Run demonstration
-demo_result = demo_analysis()
-print(f"\nAnalysis completed successfully: {demo_result['success']}")
-print(f"Overall technique score: {demo_result['scores']['overall']}/100")
+# Run demonstration (guarded: spawned pose workers re-import the caller's __main__, which imports this module)
+if __name__ == '__main__':
+    demo_result = demo_analysis()
+    print(f"\nAnalysis completed successfully: {demo_result['success']}")
+    print(f"Overall technique score: {demo_result['scores']['overall']}/100")
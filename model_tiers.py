@@ -0,0 +1,244 @@
+"""
+按延迟预算选择姿势模型档位：运行时测量每帧推理耗时，选出满足目标帧率或整体截止时间的最高档位
+"""
+import cv2
+import time
+import numpy as np
+from typing import List, Dict, Tuple
+from pose_estimation import MuayThaiPoseAnalyzer, get_video_info
+
+MODEL_TIERS = [2, 1, 0]  # heavy, full, lite
+
+# Wrists and ankles: fast motion here marks a strike worth re-running with the heavy model
+STRIKE_LANDMARKS = [15, 16, 27, 28]
+
+
+class LatencyBudgetedAnalyzer:
+    def __init__(self, target_fps: float = None, deadline_seconds: float = None,
+                 calibration_frames: int = 15, refine_strikes: bool = False,
+                 strike_margin_seconds: float = 0.3, strike_speed_percentile: float = 90,
+                 min_strike_speed: float = 2.0):
+        self.target_fps = target_fps
+        self.deadline_seconds = deadline_seconds
+        self.calibration_frames = calibration_frames
+        self.refine_strikes = refine_strikes                  # lite model everywhere, heavy around strikes
+        self.strike_margin_seconds = strike_margin_seconds
+        self.strike_speed_percentile = strike_speed_percentile
+        self.min_strike_speed = min_strike_speed              # torso lengths per second
+        self.analyzers = {}
+
+    def get_analyzer(self, tier: int) -> MuayThaiPoseAnalyzer:
+        """One analyzer per tier, created on first use"""
+        if tier not in self.analyzers:
+            self.analyzers[tier] = MuayThaiPoseAnalyzer(model_complexity=tier)
+        return self.analyzers[tier]
+
+    def frame_budget(self, total_frames: int) -> float:
+        """Seconds available per frame, or None when no budget is set"""
+        budgets = []
+        if self.target_fps:
+            budgets.append(1.0 / self.target_fps)
+        if self.deadline_seconds and total_frames:
+            budgets.append(self.deadline_seconds / total_frames)
+        return min(budgets) if budgets else None
+
+    def measure_tier(self, tier: int, video_path: str, start_frame: int = 0) -> float:
+        """Median seconds per frame (decode + inference) for a tier; the first frame (full detection) is not counted"""
+        # Separate instance: the cached analyzer's tracker must not have seen the calibration frames
+        analyzer = MuayThaiPoseAnalyzer(model_complexity=tier)
+        cap = cv2.VideoCapture(video_path)
+        # Calibrate on the footage that will be analyzed, not on dead frames before the active window
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        timings = []
+        # Timed the same way as the main frame loop, so a tier that fits here fits there
+        while len(timings) < self.calibration_frames:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            analyzer.extract_pose_from_frame(frame)
+            timings.append(time.perf_counter() - start)
+        cap.release()
+        if not timings:
+            return None
+        return float(np.median(timings[1:] if len(timings) > 1 else timings))
+
+    def select_tier(self, video_path: str, budget: float, start_frame: int = 0) -> Tuple[int, Dict[int, float]]:
+        """Highest tier whose measured per-frame time fits the budget"""
+        if budget is None:
+            return MODEL_TIERS[0], {}
+
+        timings = {}
+        for tier in MODEL_TIERS:
+            seconds = self.measure_tier(tier, video_path, start_frame)
+            if seconds is None:
+                return MODEL_TIERS[-1], timings
+            timings[tier] = seconds
+            if timings[tier] <= budget:
+                return tier, timings
+        return MODEL_TIERS[-1], timings
+
+    def analyze_video(self, video_path: str, start_frame: int = 0, end_frame: int = None) -> Dict:
+        """Same output as MuayThaiPoseAnalyzer.analyze_video, within the latency budget"""
+        job_start = time.perf_counter()
+        video_info = get_video_info(video_path)
+        # Only frames [start_frame, end_frame) count against the budget
+        end = end_frame if end_frame is not None else video_info['total_frames']
+        num_frames = max(end - start_frame, 1)
+        budget = self.frame_budget(num_frames)
+
+        if self.refine_strikes:
+            tier, timings = MODEL_TIERS[-1], {}
+        else:
+            tier, timings = self.select_tier(video_path, budget, start_frame)
+
+        pose_sequence, final_tier = self._analyze_with_budget(video_path, tier, video_info['fps'], job_start,
+                                                              start_frame, end_frame, end)
+
+        refined_frames = 0
+        if self.refine_strikes:
+            pose_sequence, refined_frames = self._refine_strikes(video_path, pose_sequence, video_info['fps'],
+                                                                 job_start, num_frames, start_frame, end)
+
+        video_info['pose_sequence'] = pose_sequence
+        video_info['model_tier'] = {
+            'initial': tier,
+            'final': final_tier,
+            'calibration_ms': {t: round(seconds * 1000, 1) for t, seconds in timings.items()},
+            'refined_frames': refined_frames,
+            'elapsed_seconds': round(time.perf_counter() - job_start, 2)
+        }
+        return video_info
+
+    def _remaining_budget(self, job_start: float, frames_left: int) -> float:
+        """Per-frame budget for the rest of the job, counting time already spent"""
+        budgets = []
+        if self.target_fps:
+            budgets.append(1.0 / self.target_fps)
+        if self.deadline_seconds:
+            time_left = self.deadline_seconds - (time.perf_counter() - job_start)
+            budgets.append(max(time_left, 0.0) / max(frames_left, 1))
+        return min(budgets) if budgets else None
+
+    def _time_left(self, job_start: float, total_frames: int) -> float:
+        """Seconds left in the whole job (deadline, or total_frames at the target fps), None if unbounded"""
+        limits = []
+        if self.target_fps:
+            limits.append(total_frames / self.target_fps)
+        if self.deadline_seconds:
+            limits.append(self.deadline_seconds)
+        if not limits:
+            return None
+        return min(limits) - (time.perf_counter() - job_start)
+
+    def _analyze_with_budget(self, video_path: str, tier: int, fps: float, job_start: float,
+                             start_frame: int, end_frame: int, budget_end: int) -> Tuple[List[Dict], int]:
+        """Frame loop that steps down a tier when the running per-frame time overshoots the budget"""
+        analyzer = self.get_analyzer(tier)
+        cap = cv2.VideoCapture(video_path)
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        # Some codecs can only seek to key frames; trust the position the decoder reports
+        frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        pose_data = []
+        recent_timings = []
+
+        while cap.isOpened() and (end_frame is None or frame_idx < end_frame):
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            landmarks = analyzer.extract_pose_from_frame(frame)
+            if landmarks and frame_idx >= start_frame:
+                pose_data.append({
+                    'frame': frame_idx,
+                    'timestamp': frame_idx / fps,
+                    'landmarks': landmarks
+                })
+            frame_idx += 1
+
+            # Load spikes: drop to a lighter model rather than miss the deadline
+            recent_timings.append(time.perf_counter() - start)
+            if len(recent_timings) >= self.calibration_frames:
+                budget = self._remaining_budget(job_start, budget_end - frame_idx)
+                if budget is not None and np.median(recent_timings) > budget * 1.2 and tier != MODEL_TIERS[-1]:
+                    tier = MODEL_TIERS[MODEL_TIERS.index(tier) + 1]
+                    analyzer = self.get_analyzer(tier)
+                    print(f"Frame {frame_idx}: over latency budget, switching to model tier {tier}")
+                recent_timings = []
+
+        cap.release()
+        return pose_data, tier
+
+    def _refine_strikes(self, video_path: str, pose_sequence: List[Dict], fps: float, job_start: float,
+                        num_frames: int, start_frame: int = 0,
+                        end_frame: int = None) -> Tuple[List[Dict], int]:
+        """Re-run the heavy model on time windows around fast wrist/ankle motion inside [start_frame, end_frame),
+        fastest strikes first"""
+        if len(pose_sequence) < 3:
+            return pose_sequence, 0
+
+        frames = np.array([frame_data['frame'] for frame_data in pose_sequence])
+        landmarks = np.array([[[landmark['x'], landmark['y']] for landmark in frame_data['landmarks']]
+                              for frame_data in pose_sequence])
+
+        # Speeds in torso lengths per second, as in MotionEventDetector, so the floor does not
+        # depend on camera distance
+        shoulder_center = landmarks[:, [11, 12]].mean(axis=1)
+        hip_center = landmarks[:, [23, 24]].mean(axis=1)
+        torso_length = max(float(np.median(np.linalg.norm(shoulder_center - hip_center, axis=1))), 1e-6)
+        points = landmarks[:, STRIKE_LANDMARKS]
+        speed = (np.linalg.norm(np.diff(points, axis=0), axis=2).max(axis=1)
+                 / (np.maximum(np.diff(frames), 1) / fps) / torso_length)
+
+        # The percentile alone would flag the fastest 10% of frames even in a clip without a strike
+        threshold = max(np.percentile(speed, self.strike_speed_percentile), self.min_strike_speed)
+        is_strike = speed > threshold
+        strike_frames = frames[1:][is_strike]
+        strike_speeds = speed[is_strike]
+
+        # Merge strike frames into windows padded by the margin on both sides
+        margin = int(self.strike_margin_seconds * fps)
+        windows = []
+        for frame_idx, frame_speed in zip(strike_frames, strike_speeds):
+            # Windows stay inside the analyzed range; the margin before start_frame is only warm-up
+            start = max(start_frame, frame_idx - margin)
+            end = frame_idx + margin + 1 if end_frame is None else min(end_frame, frame_idx + margin + 1)
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+                windows[-1][2] = max(windows[-1][2], frame_speed)
+            else:
+                windows.append([start, end, frame_speed])
+        windows.sort(key=lambda window: window[2], reverse=True)
+
+        # Heavy re-runs share the job's budget: skip windows that no longer fit
+        heavy = self.get_analyzer(MODEL_TIERS[0])
+        heavy_seconds = None
+        if self._time_left(job_start, num_frames) is not None:
+            heavy_seconds = self.measure_tier(MODEL_TIERS[0], video_path, start_frame)
+
+        refined = {frame_data['frame']: frame_data for frame_data in pose_sequence}
+        refined_frames = 0
+        for start, end, _ in windows:
+            decoded_frames = end - max(0, start - margin)
+            time_left = self._time_left(job_start, num_frames)
+            if time_left is not None and heavy_seconds is not None and decoded_frames * heavy_seconds > time_left:
+                continue
+
+            window_start = time.perf_counter()
+            for frame_data in heavy.analyze_frame_range(video_path, start, end, warmup_frames=margin):
+                refined[frame_data['frame']] = frame_data
+                refined_frames += 1
+            if heavy_seconds is not None:
+                heavy_seconds = (time.perf_counter() - window_start) / decoded_frames
+
+        in_range = [frame_idx for frame_idx in sorted(refined)
+                    if frame_idx >= start_frame and (end_frame is None or frame_idx < end_frame)]
+        return [refined[frame_idx] for frame_idx in in_range], refined_frames
+
+# Example usage
+budgeted_analyzer = LatencyBudgetedAnalyzer(target_fps=30)
+print("Latency-budgeted analyzer initialized!")
+print("Per-frame budget for a 300-frame job at 30 fps (s):", budgeted_analyzer.frame_budget(300))
@@ -0,0 +1,160 @@
+"""
+基于运动学事件的关键帧选择：动作起始、肢体峰值速度、最大伸展、回到防守位，并按参考时间模式划分动作阶段
+"""
+import numpy as np
+from typing import List, Dict, Optional
+from pose_arrays import sequence_to_array
+from real_reference_poses import RealReferencePoses
+
+# (left, right) landmark indices of the striking end point and the joint it extends from
+STRIKING_LIMBS = {
+    'jab': ((15, 16), (11, 12)),
+    'cross': ((15, 16), (11, 12)),
+    'hook': ((15, 16), (11, 12)),
+    'uppercut': ((15, 16), (11, 12)),
+    'elbow_strike': ((13, 14), (11, 12)),
+    'roundhouse_kick': ((27, 28), (23, 24)),
+    'teep': ((27, 28), (23, 24)),
+    'knee_strike': ((25, 26), (23, 24))
+}
+
+KEY_EVENTS = ['guard', 'start_of_motion', 'peak_velocity', 'max_extension', 'return_to_guard']
+
+DEFAULT_PHASES = ['setup', 'execution', 'recovery']
+
+# Phase order per technique; timing standards are looked up by name, never by dict order
+TECHNIQUE_PHASES = {
+    'roundhouse_kick': ['chamber', 'extension', 'impact', 'retraction']
+}
+
+
+class MotionEventDetector:
+    def __init__(self, reference_poses: RealReferencePoses = None, onset_ratio: float = 0.2,
+                 impact_ratio: float = 0.9, return_ratio: float = 0.3, min_peak_speed: float = 0.5):
+        self.reference_poses = reference_poses or RealReferencePoses()
+        self.onset_ratio = onset_ratio          # fraction of peak speed that counts as moving
+        self.impact_ratio = impact_ratio        # fraction of extension range that counts as impact
+        self.return_ratio = return_ratio        # fraction of extension range left when back in guard
+        self.min_peak_speed = min_peak_speed    # torso lengths per second
+
+    def detect_events(self, pose_sequence: List[Dict], technique: str) -> Optional[Dict]:
+        """Find kinematic events of the strike in one vectorized pass over the sequence"""
+        frame_indices, timestamps, landmarks = sequence_to_array(pose_sequence)
+        if len(timestamps) < 4:
+            return None
+
+        end_points, roots = STRIKING_LIMBS.get(technique, STRIKING_LIMBS['jab'])
+        xy = landmarks[:, :, :2]
+
+        # Normalize distances by torso length so camera distance does not matter
+        shoulder_center = xy[:, [11, 12]].mean(axis=1)
+        hip_center = xy[:, [23, 24]].mean(axis=1)
+        torso_length = max(float(np.median(np.linalg.norm(shoulder_center - hip_center, axis=1))), 1e-6)
+
+        limb_ends = xy[:, list(end_points)]
+        limb_roots = xy[:, list(roots)]
+
+        dt = np.diff(timestamps)
+        dt = np.where(dt > 0, dt, np.inf)
+        speeds = np.linalg.norm(np.diff(limb_ends, axis=0), axis=2) / dt[:, None] / torso_length
+        speeds = self._smooth(speeds)
+
+        # The striking side is the one that moves fastest
+        side = int(np.argmax(speeds.max(axis=0)))
+        speed = np.concatenate([[0.0], speeds[:, side]])
+        extension = np.linalg.norm(limb_ends[:, side] - limb_roots[:, side], axis=1) / torso_length
+        extension = self._smooth(extension[:, None])[:, 0]
+
+        # Peak velocity is taken on the way out, not on the retraction
+        extending = np.concatenate([[False], np.diff(extension) > 0])
+        outward_speed = np.where(extending, speed, 0.0)
+        if outward_speed.max() < self.min_peak_speed:
+            return None
+        peak_velocity = int(np.argmax(outward_speed))
+
+        moving = speed >= speed[peak_velocity] * self.onset_ratio
+        still_before = np.flatnonzero(~moving[:peak_velocity + 1])
+        start_of_motion = int(still_before[-1]) if still_before.size else 0
+
+        # Maximum extension is where the limb stops extending after the peak
+        stopped = np.flatnonzero(~extending[peak_velocity + 1:])
+        max_extension = peak_velocity + int(stopped[0]) if stopped.size else len(speed) - 1
+
+        baseline = extension[start_of_motion]
+        extension_range = extension[max_extension] - baseline
+        returned = np.flatnonzero(
+            extension[max_extension:] <= baseline + self.return_ratio * extension_range
+        )
+        return_to_guard = max_extension + int(returned[0]) if returned.size else len(speed) - 1
+
+        # Impact window: contiguous frames around max extension near full extension
+        near_full = extension >= baseline + self.impact_ratio * extension_range
+        before = np.flatnonzero(~near_full[:max_extension])
+        after = np.flatnonzero(~near_full[max_extension:])
+        impact_start = int(before[-1]) + 1 if before.size else 0
+        impact_end = max_extension + int(after[0]) - 1 if after.size else len(speed) - 1
+
+        positions = {
+            'guard': 0,
+            'start_of_motion': start_of_motion,
+            'peak_velocity': peak_velocity,
+            'max_extension': max_extension,
+            'return_to_guard': return_to_guard,
+            'impact_start': impact_start,
+            'impact_end': impact_end
+        }
+
+        return {
+            'striking_side': 'left' if side == 0 else 'right',
+            'peak_speed': round(float(speed[peak_velocity]), 3),
+            'events': {
+                name: {'frame': int(frame_indices[pos]), 'timestamp': float(timestamps[pos])}
+                for name, pos in positions.items()
+            },
+            'phases': self._split_phases(positions, timestamps, technique)
+        }
+
+    def _split_phases(self, positions: Dict[str, int], timestamps: np.ndarray, technique: str) -> List[Dict]:
+        """Split the strike into the phases listed in the technique's timing patterns"""
+        timing_patterns = self.reference_poses.get_technique_standards(technique).get('timing_patterns', {})
+        phase_names = TECHNIQUE_PHASES.get(technique, DEFAULT_PHASES)
+
+        if len(phase_names) == 4:
+            boundary_events = ['start_of_motion', 'peak_velocity', 'impact_start', 'impact_end', 'return_to_guard']
+        else:
+            boundary_events = ['start_of_motion', 'peak_velocity', 'max_extension', 'return_to_guard']
+
+        # Events can coincide or cross on noisy clips; keep boundaries ordered
+        boundaries = np.maximum.accumulate([positions[name] for name in boundary_events])
+        boundary_times = timestamps[boundaries]
+
+        phases = []
+        for i, name in enumerate(phase_names):
+            duration = float(boundary_times[i + 1] - boundary_times[i])
+            phase = {
+                'name': name,
+                'start_time': round(float(boundary_times[i]), 3),
+                'end_time': round(float(boundary_times[i + 1]), 3),
+                'duration': round(duration, 3)
+            }
+            standard = timing_patterns.get(f'{name}_duration')
+            if standard:
+                phase['reference_mean'] = standard['mean']
+                phase['score'] = self.reference_poses.calculate_deviation_score(duration, standard)
+            phases.append(phase)
+
+        return phases
+
+    def _smooth(self, values: np.ndarray, window: int = 3) -> np.ndarray:
+        """Centered moving average along the time axis"""
+        if len(values) < window:
+            return values
+        kernel = np.ones(window) / window
+        padded = np.pad(values, ((window // 2, window // 2), (0, 0)), mode='edge')
+        return np.stack([np.convolve(padded[:, col], kernel, mode='valid')
+                         for col in range(values.shape[1])], axis=1)
+
+# Example usage
+motion_detector = MotionEventDetector()
+print("Motion event detector initialized!")
+print("Key events:", KEY_EVENTS)
@@ -0,0 +1,207 @@
+"""
+多机位融合：同一次动作的正面、侧面、45°视频并行提取姿势，按时间对齐后融合为一条更可靠的姿势序列
+"""
+import numpy as np
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+from pose_estimation import MuayThaiPoseAnalyzer
+from pose_arrays import sequence_to_array, array_to_sequence
+
+# Camera yaw around the fighter, counter-clockwise seen from above (angles from data_collection_plan.py)
+VIEW_YAW_DEGREES = {
+    'front': 0,
+    '45_degree': 45,
+    'side': 90
+}
+
+# Wrists and ankles carry most of the motion used to line the clips up in time
+SYNC_LANDMARKS = [15, 16, 27, 28]
+
+
+def _extract_view_pose(video_path: str, model_complexity: int = 2) -> Dict:
+    """Worker entry point: every process needs its own MediaPipe graph"""
+    return MuayThaiPoseAnalyzer(model_complexity=model_complexity).analyze_video(video_path)
+
+
+class MultiViewFusion:
+    def __init__(self, primary_view: str = 'front', view_yaw_degrees: Dict[str, float] = None,
+                 max_offset_seconds: float = 1.0, model_complexity: int = 2):
+        self.primary_view = primary_view
+        self.view_yaw_degrees = view_yaw_degrees or VIEW_YAW_DEGREES
+        self.max_offset_seconds = max_offset_seconds
+        self.model_complexity = model_complexity
+
+    def extract_and_fuse(self, video_paths: Dict[str, str]) -> Dict:
+        """Extract every view in parallel and fuse them into one pose data dict"""
+        return self.fuse(self.extract_views(video_paths))
+
+    def extract_views(self, video_paths: Dict[str, str]) -> Dict[str, Dict]:
+        """Run pose extraction for all views concurrently; failed or empty views are dropped"""
+        view_data = {}
+        if not video_paths:
+            return view_data
+        # Spawn, not fork: the parent already holds MediaPipe graphs that must not be forked
+        with ProcessPoolExecutor(max_workers=len(video_paths), mp_context=mp.get_context('spawn')) as executor:
+            futures = {view: executor.submit(_extract_view_pose, path, self.model_complexity) for view, path in video_paths.items()}
+            for view, future in futures.items():
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"Skipping {view} view: {e}")
+                    continue
+                if data['pose_sequence']:
+                    view_data[view] = data
+        return view_data
+
+    def fuse(self, view_data: Dict[str, Dict]) -> Dict:
+        """Fuse per-view pose data onto the primary view's timeline and image coordinates"""
+        if not view_data:
+            return {'total_frames': 0, 'fps': 0, 'duration': 0, 'pose_sequence': [], 'views': []}
+
+        primary = self.primary_view if self.primary_view in view_data else next(iter(view_data))
+        primary_data = view_data[primary]
+        if len(view_data) == 1:
+            return {**primary_data, 'views': [primary], 'time_offsets': {primary: 0.0}}
+
+        _, primary_timestamps, primary_landmarks = sequence_to_array(primary_data['pose_sequence'])
+        fps = primary_data['fps']
+        primary_yaw = self.view_yaw_degrees.get(primary, 0)
+
+        # Line every other view up with the primary in time
+        aligned = {primary: (primary_timestamps, primary_landmarks)}
+        time_offsets = {primary: 0.0}
+        for view, data in view_data.items():
+            if view == primary:
+                continue
+            _, view_timestamps, view_landmarks = sequence_to_array(data['pose_sequence'])
+            offset = self._estimate_time_offset(primary_timestamps, primary_landmarks,
+                                                view_timestamps, view_landmarks, fps)
+            aligned[view] = (view_timestamps + offset, view_landmarks)
+            time_offsets[view] = round(float(offset), 3)
+
+        # Fused frames: every primary frame any view detected, so a pose the primary camera
+        # missed (occlusion, motion blur) is recovered from the other views
+        frame_indices = self._grid_frames(aligned, fps, primary_data['total_frames'])
+        timestamps = frame_indices / fps
+
+        # Primary image placement of the body; interpolated across frames the primary missed
+        _, primary_center, scale = self._to_body_frame(primary_landmarks, primary_data['resolution'])
+        center = np.stack([np.interp(timestamps, primary_timestamps, primary_center[:, axis])
+                           for axis in range(3)], axis=1)
+
+        weighted_sum = np.zeros((len(frame_indices), primary_landmarks.shape[1], 3))
+        weight_total = np.zeros((len(frame_indices), primary_landmarks.shape[1]))
+        fused_visibility = np.zeros_like(weight_total)
+        detected = np.zeros(len(frame_indices), dtype=bool)
+
+        for view, (view_timestamps, view_landmarks) in aligned.items():
+            matched, valid = self._match_frames(timestamps, view_timestamps, 0.5 / fps)
+
+            view_body, _, _ = self._to_body_frame(view_landmarks[matched], view_data[view]['resolution'])
+            view_body = self._rotate_yaw(view_body, self.view_yaw_degrees.get(view, 0) - primary_yaw)
+            view_visibility = view_landmarks[matched, :, 3] * valid[:, None]
+
+            weighted_sum += view_body * view_visibility[:, :, None]
+            weight_total += view_visibility
+            fused_visibility = np.maximum(fused_visibility, view_visibility)
+            detected |= valid
+
+        fused_body = weighted_sum[detected] / np.maximum(weight_total[detected], 1e-6)[:, :, None]
+        fused = np.concatenate([
+            self._from_body_frame(fused_body, center[detected], scale, primary_data['resolution']),
+            fused_visibility[detected][:, :, None]
+        ], axis=2)
+        frame_indices, timestamps = frame_indices[detected], timestamps[detected]
+
+        return {
+            'total_frames': primary_data['total_frames'],
+            'fps': fps,
+            'duration': primary_data['duration'],
+            'resolution': primary_data['resolution'],
+            'views': list(time_offsets),
+            'time_offsets': time_offsets,
+            'pose_sequence': array_to_sequence(frame_indices, timestamps, fused)
+        }
+
+    def _grid_frames(self, aligned: Dict[str, Tuple[np.ndarray, np.ndarray]], fps: float,
+                     total_frames: int) -> np.ndarray:
+        """Primary-video frame numbers covered by at least one aligned view, within the primary's length"""
+        frames = np.unique(np.concatenate([np.rint(view_timestamps * fps).astype(np.int64)
+                                           for view_timestamps, _ in aligned.values()]))
+        frames = frames[frames >= 0]
+        if total_frames:
+            frames = frames[frames < total_frames]
+        return frames
+
+    def _to_body_frame(self, landmarks: np.ndarray, resolution: Tuple[int, int]):
+        """Hip-centered, torso-scaled 3D coordinates with the same unit on every axis"""
+        aspect = resolution[0] / resolution[1] if resolution and resolution[1] else 1.0
+        # MediaPipe normalizes x by width and y by height; z uses the x scale
+        points = landmarks[:, :, :3] * np.array([aspect, 1.0, aspect])
+
+        center = points[:, [23, 24]].mean(axis=1)
+        shoulder_center = points[:, [11, 12]].mean(axis=1)
+        scale = max(float(np.median(np.linalg.norm(shoulder_center - center, axis=1))), 1e-6)
+
+        return (points - center[:, None, :]) / scale, center, scale
+
+    def _from_body_frame(self, body: np.ndarray, center: np.ndarray, scale: float,
+                         resolution: Tuple[int, int]) -> np.ndarray:
+        """Inverse of _to_body_frame for the primary view"""
+        aspect = resolution[0] / resolution[1] if resolution and resolution[1] else 1.0
+        points = body * scale + center[:, None, :]
+        return points / np.array([aspect, 1.0, aspect])
+
+    def _rotate_yaw(self, points: np.ndarray, degrees: float) -> np.ndarray:
+        """Rotate body-frame points around the vertical axis"""
+        theta = np.radians(degrees)
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        rotated = points.copy()
+        rotated[..., 0] = points[..., 0] * cos_t + points[..., 2] * sin_t
+        rotated[..., 2] = -points[..., 0] * sin_t + points[..., 2] * cos_t
+        return rotated
+
+    def _motion_energy(self, timestamps: np.ndarray, landmarks: np.ndarray, fps: float) -> np.ndarray:
+        """Limb speed summed over SYNC_LANDMARKS, resampled to a uniform grid starting at t=0"""
+        dt = np.maximum(np.diff(timestamps), 1e-6)
+        speed = np.linalg.norm(np.diff(landmarks[:, SYNC_LANDMARKS, :2], axis=0), axis=2).sum(axis=1) / dt
+        grid = np.arange(0, timestamps[-1], 1.0 / fps)
+        energy = np.interp(grid, timestamps[1:], speed)
+        return (energy - energy.mean()) / (energy.std() + 1e-9)
+
+    def _estimate_time_offset(self, primary_timestamps: np.ndarray, primary_landmarks: np.ndarray,
+                              view_timestamps: np.ndarray, view_landmarks: np.ndarray, fps: float) -> float:
+        """Seconds to add to the view's timestamps so its motion lines up with the primary view"""
+        if len(primary_timestamps) < 3 or len(view_timestamps) < 3:
+            return 0.0
+
+        primary_energy = self._motion_energy(primary_timestamps, primary_landmarks, fps)
+        view_energy = self._motion_energy(view_timestamps, view_landmarks, fps)
+        if len(primary_energy) == 0 or len(view_energy) == 0:
+            return 0.0
+
+        correlation = np.correlate(primary_energy, view_energy, mode='full')
+        lags = np.arange(-(len(view_energy) - 1), len(primary_energy))
+        allowed = np.abs(lags) <= self.max_offset_seconds * fps
+        best_lag = lags[allowed][np.argmax(correlation[allowed])]
+        return best_lag / fps
+
+    def _match_frames(self, target_times: np.ndarray, source_times: np.ndarray,
+                      tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest source frame for every target time, and whether it is close enough to use"""
+        if len(source_times) == 1:
+            matched = np.zeros(len(target_times), dtype=np.int64)
+            return matched, np.abs(source_times[0] - target_times) <= tolerance
+        upper = np.clip(np.searchsorted(source_times, target_times), 1, len(source_times) - 1)
+        lower = upper - 1
+        use_upper = np.abs(source_times[upper] - target_times) < np.abs(source_times[lower] - target_times)
+        matched = np.where(use_upper, upper, lower)
+        valid = np.abs(source_times[matched] - target_times) <= tolerance
+        return matched, valid
+
+# Example usage (guarded: spawned workers import this module)
+if __name__ == '__main__':
+    view_fusion = MultiViewFusion()
+    print("Multi-view fusion initialized!")
+    print("Supported camera angles:", list(view_fusion.view_yaw_degrees.keys()))
@@ -0,0 +1,80 @@
+"""
+姿势序列与列式 numpy 数组之间的转换，供向量化的分析阶段使用
+"""
+import numpy as np
+from typing import List, Dict, Tuple
+
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+
+
+def sequence_to_array(pose_sequence: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert a pose sequence into (frame_indices, timestamps, landmarks[N, 33, 4]) arrays"""
+    frames = [frame_data for frame_data in pose_sequence
+              if len(frame_data['landmarks']) >= NUM_LANDMARKS]
+
+    frame_indices = np.array([frame_data['frame'] for frame_data in frames], dtype=np.int64)
+    timestamps = np.array([frame_data['timestamp'] for frame_data in frames], dtype=np.float64)
+    landmarks = np.array([
+        [[landmark[field] for field in LANDMARK_FIELDS]
+         for landmark in frame_data['landmarks'][:NUM_LANDMARKS]]
+        for frame_data in frames
+    ], dtype=np.float64).reshape(len(frames), NUM_LANDMARKS, len(LANDMARK_FIELDS))
+
+    return frame_indices, timestamps, landmarks
+
+
+def array_to_sequence(frame_indices: np.ndarray, timestamps: np.ndarray,
+                      landmarks: np.ndarray) -> List[Dict]:
+    """Convert columnar arrays back into the pose sequence format used by the scorers"""
+    pose_sequence = []
+    for frame_idx, timestamp, frame_landmarks in zip(frame_indices.tolist(), timestamps.tolist(),
+                                                     landmarks.tolist()):
+        pose_sequence.append({
+            'frame': frame_idx,
+            'timestamp': timestamp,
+            'landmarks': [dict(zip(LANDMARK_FIELDS, values)) for values in frame_landmarks]
+        })
+    return pose_sequence
+
+
+# (name, first point, vertex, second point) for the joint angles used in pose comparison
+JOINT_ANGLES = [
+    ('left_elbow', 11, 13, 15),
+    ('right_elbow', 12, 14, 16),
+    ('left_shoulder', 23, 11, 13),
+    ('right_shoulder', 24, 12, 14),
+    ('left_hip', 11, 23, 25),
+    ('right_hip', 12, 24, 26),
+    ('left_knee', 23, 25, 27),
+    ('right_knee', 24, 26, 28)
+]
+
+
+def joint_angles(landmarks: np.ndarray, joints: List[Tuple] = None) -> np.ndarray:
+    """Angles in degrees at every joint for every frame, shape [N, len(joints)]"""
+    joints = joints or JOINT_ANGLES
+    xy = landmarks[:, :, :2]
+    first = xy[:, [joint[1] for joint in joints]]
+    vertex = xy[:, [joint[2] for joint in joints]]
+    second = xy[:, [joint[3] for joint in joints]]
+
+    v1 = first - vertex
+    v2 = second - vertex
+    norms = np.linalg.norm(v1, axis=2) * np.linalg.norm(v2, axis=2)
+    cos_angle = np.sum(v1 * v2, axis=2) / np.maximum(norms, 1e-9)
+    return np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
+
+
+def resample_positions(length: int, target_length: int) -> np.ndarray:
+    """Evenly spaced positions into a sequence of `length` frames"""
+    return np.linspace(0, length - 1, target_length)
+
+
+def resample_series(series: np.ndarray, target_length: int) -> np.ndarray:
+    """Linearly resample a [N, D] time series to [target_length, D]"""
+    positions = resample_positions(len(series), target_length)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, len(series) - 1)
+    weight = (positions - lower)[:, None]
+    return series[lower] * (1 - weight) + series[upper] * weight
@@ -0,0 +1,138 @@
+"""
+可断点续跑的姿势提取：定期把已提取的姿势数据追加写成本地分块文件，任务重启后从最后一个检查点继续而不是从第 0 帧开始
+"""
+import os
+import json
+import glob
+import shutil
+import hashlib
+from typing import List, Dict
+from pose_estimation import MuayThaiPoseAnalyzer, get_video_info
+
+
+class CheckpointedVideoAnalyzer:
+    def __init__(self, checkpoint_dir: str = 'pose_checkpoints', checkpoint_seconds: float = 10.0,
+                 warmup_seconds: float = 1.0, cleanup_on_success: bool = True, model_complexity: int = 2):
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_seconds = checkpoint_seconds    # video time between checkpoint chunks
+        self.warmup_seconds = warmup_seconds            # tracker warm-up before the resume point
+        self.cleanup_on_success = cleanup_on_success
+        self.model_complexity = model_complexity
+
+    def job_dir(self, video_path: str, start_frame: int = 0, end_frame: int = None, job_id: str = None) -> str:
+        """Checkpoint directory of one job; by default keyed by the video file's path, size, mtime and frame range"""
+        if job_id is None:
+            stat = os.stat(video_path)
+            key = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}:{start_frame}:{end_frame}"
+            job_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.checkpoint_dir, job_id)
+
+    def analyze_video(self, video_path: str, start_frame: int = 0, end_frame: int = None,
+                      job_id: str = None) -> Dict:
+        """Same output as MuayThaiPoseAnalyzer.analyze_video, resuming from the last checkpoint if any"""
+        video_info = get_video_info(video_path)
+        video_info['pose_sequence'] = self.extract_range(video_path, start_frame, end_frame, job_id=job_id)
+        if self.cleanup_on_success:
+            self.clear(video_path, start_frame, end_frame, job_id)
+        return video_info
+
+    def extract_range(self, video_path: str, start_frame: int = 0, end_frame: int = None,
+                      job_id: str = None, warmup_frames: int = 0) -> List[Dict]:
+        """Pose frames of [start_frame, end_frame), restored from checkpoints and extracted from where they stop;
+        warmup_frames before start_frame are run but not returned (e.g. for a chunk in the middle of a video)"""
+        video_info = get_video_info(video_path)
+        job_dir = self.job_dir(video_path, start_frame, end_frame, job_id)
+        pose_data, resume_frame, complete = self.load_checkpoints(job_dir, video_info, start_frame)
+
+        if not complete:
+            if resume_frame > start_frame:
+                print(f"Resuming pose extraction at frame {resume_frame} ({len(pose_data)} frames restored)")
+            pose_data.extend(self._extract_with_checkpoints(video_path, job_dir, video_info['fps'],
+                                                            resume_frame, end_frame, start_frame, warmup_frames))
+        return pose_data
+
+    def clear(self, video_path: str, start_frame: int = 0, end_frame: int = None, job_id: str = None):
+        """Remove a job's checkpoints once its result is no longer needed"""
+        shutil.rmtree(self.job_dir(video_path, start_frame, end_frame, job_id), ignore_errors=True)
+
+    def load_checkpoints(self, job_dir: str, video_info: Dict, start_frame: int = 0):
+        """Pose frames restored from chunk files, the frame to resume at, and whether the job finished"""
+        manifest_path = os.path.join(job_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest['total_frames'] != video_info['total_frames'] or manifest['fps'] != video_info['fps']:
+                # Different video under the same job id; its checkpoints cannot be reused
+                shutil.rmtree(job_dir)
+
+        os.makedirs(job_dir, exist_ok=True)
+        if not os.path.exists(manifest_path):
+            self._write_atomic(manifest_path, {'total_frames': video_info['total_frames'],
+                                               'fps': video_info['fps']})
+
+        pose_data = []
+        resume_frame = start_frame
+        complete = False
+        # Zero-padded start frames keep chunk files in order; half-written .tmp files are ignored
+        for chunk_path in sorted(glob.glob(os.path.join(job_dir, 'chunk_*.json'))):
+            with open(chunk_path, 'r', encoding='utf-8') as f:
+                chunk = json.load(f)
+            if chunk['start_frame'] != resume_frame:
+                break
+            pose_data.extend(chunk['frames'])
+            resume_frame = chunk['end_frame']
+            complete = chunk['final']
+        return pose_data, resume_frame, complete
+
+    def _extract_with_checkpoints(self, video_path: str, job_dir: str, fps: float, resume_frame: int,
+                                  end_frame: int, start_frame: int, warmup_frames: int = 0) -> List[Dict]:
+        """Extract from resume_frame to end_frame, appending a chunk file every checkpoint_seconds"""
+        fps = fps or 30.0
+        interval = max(1, int(self.checkpoint_seconds * fps))
+        # MediaPipe's tracker state cannot be saved; re-acquire it on frames before the resume point
+        if resume_frame > start_frame:
+            warmup_frames = int(self.warmup_seconds * fps)
+
+        # Fresh tracker per extraction, created only once there is something to extract
+        pose_analyzer = MuayThaiPoseAnalyzer(model_complexity=self.model_complexity)
+        extracted = []
+        chunk_frames = []
+        chunk_start = next_frame = resume_frame
+        for frame_idx, timestamp, landmarks in pose_analyzer.iter_frame_range(
+                video_path, resume_frame, end_frame, warmup_frames):
+            if landmarks:
+                chunk_frames.append({'frame': frame_idx, 'timestamp': timestamp, 'landmarks': landmarks})
+            next_frame = frame_idx + 1
+            if next_frame - chunk_start >= interval:
+                self._write_chunk(job_dir, chunk_start, next_frame, chunk_frames, final=False)
+                extracted.extend(chunk_frames)
+                chunk_frames = []
+                chunk_start = next_frame
+
+        self._write_chunk(job_dir, chunk_start, next_frame, chunk_frames, final=True)
+        extracted.extend(chunk_frames)
+        return extracted
+
+    def _write_chunk(self, job_dir: str, start_frame: int, end_frame: int, frames: List[Dict], final: bool):
+        chunk_path = os.path.join(job_dir, f"chunk_{start_frame:08d}.json")
+        self._write_atomic(chunk_path, {
+            'start_frame': start_frame,
+            'end_frame': end_frame,
+            'final': final,
+            'frames': frames
+        })
+
+    def _write_atomic(self, path: str, data: Dict):
+        # A worker killed mid-write leaves only a .tmp file, never a truncated chunk
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+# Example usage (guarded: spawned chunk workers import this module)
+if __name__ == '__main__':
+    checkpointed_analyzer = CheckpointedVideoAnalyzer()
+    print("Checkpointed video analyzer initialized!")
+    print(f"Checkpoint every {checkpointed_analyzer.checkpoint_seconds}s of video in {checkpointed_analyzer.checkpoint_dir}/")
@@ -4,13 +4,35 @@ import mediapipe as mp
 from typing import List, Dict, Tuple
 import json
 
+
+def get_video_info(video_path: str) -> Dict:
+    """Read frame count, fps, duration and resolution without decoding frames or loading a model"""
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    
+    return {
+        'total_frames': frame_count,
+        'fps': fps,
+        'duration': frame_count / fps,
+        'resolution': (width, height)
+    }
+
+
 class MuayThaiPoseAnalyzer:
-    def __init__(self):
-        # Initialize MediaPipe Pose
+    def __init__(self, model_complexity: int = 2, static_image_mode: bool = False):
+        # Initialize MediaPipe Pose (0 = lite, 1 = full, 2 = heavy)
+        self.model_complexity = model_complexity
         self.mp_pose = mp.solutions.pose
+        # Static image mode treats every frame independently (no tracking, no temporal smoothing),
+        # for callers that feed frames out of order
         self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=2,
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
+            smooth_landmarks=not static_image_mode,
             enable_segmentation=False,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
@@ -37,6 +59,10 @@ class MuayThaiPoseAnalyzer:
     def extract_pose_from_frame(self, frame):
         """Extract pose landmarks from a single frame"""
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.extract_pose_from_rgb(rgb_frame)
+    
+    def extract_pose_from_rgb(self, rgb_frame):
+        """Extract pose landmarks from a frame that is already in RGB order"""
         results = self.pose.process(rgb_frame)
         
         if results.pose_landmarks:
@@ -51,40 +77,54 @@ class MuayThaiPoseAnalyzer:
             return landmarks
         return None
     
-    def analyze_video(self, video_path: str) -> Dict:
-        """Analyze entire video and extract pose data"""
-        cap = cv2.VideoCapture(video_path)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
+    def analyze_video(self, video_path: str, start_frame: int = 0, end_frame: int = None) -> Dict:
+        """Analyze entire video (or only frames [start_frame, end_frame)) and extract pose data"""
+        video_info = get_video_info(video_path)
+        video_info['pose_sequence'] = self.analyze_frame_range(video_path, start_frame, end_frame)
+        return video_info
+    
+    def analyze_frame_range(self, video_path: str, start_frame: int = 0, end_frame: int = None,
+                            warmup_frames: int = 0) -> List[Dict]:
+        """Extract pose data for frames [start_frame, end_frame), tracking through warmup frames first"""
         pose_data = []
-        frame_idx = 0
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            landmarks = self.extract_pose_from_frame(frame)
+        for frame_idx, timestamp, landmarks in self.iter_frame_range(video_path, start_frame, end_frame,
+                                                                     warmup_frames):
             if landmarks:
                 pose_data.append({
                     'frame': frame_idx,
-                    'timestamp': frame_idx / fps,
+                    'timestamp': timestamp,
                     'landmarks': landmarks
                 })
-            
-            frame_idx += 1
+        return pose_data
+    
+    def iter_frame_range(self, video_path: str, start_frame: int = 0, end_frame: int = None,
+                         warmup_frames: int = 0):
+        """Yield (frame_idx, timestamp, landmarks or None) for every decoded frame in [start_frame, end_frame)"""
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
         
-        cap.release()
+        first_frame = max(0, start_frame - warmup_frames)
+        if first_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+        # Some codecs can only seek to key frames; trust the position the decoder reports
+        frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
         
-        return {
-            'total_frames': frame_count,
-            'fps': fps,
-            'duration': frame_count / fps,
-            'pose_sequence': pose_data
-        }
+        try:
+            while cap.isOpened() and (end_frame is None or frame_idx < end_frame):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                landmarks = self.extract_pose_from_frame(frame)
+                if frame_idx >= start_frame:
+                    yield frame_idx, frame_idx / fps, landmarks
+                
+                frame_idx += 1
+        finally:
+            cap.release()
 
-# Example usage
-analyzer = MuayThaiPoseAnalyzer()
-print("Pose analyzer initialized successfully!")
-print("Key landmarks tracked:", list(analyzer.key_landmarks.keys()))
+# Example usage (guarded: spawned pose workers import this module)
+if __name__ == '__main__':
+    analyzer = MuayThaiPoseAnalyzer()
+    print("Pose analyzer initialized successfully!")
+    print("Key landmarks tracked:", list(analyzer.key_landmarks.keys()))
@@ -1,11 +1,12 @@
 """
 真实的参考姿势数据需要从专业运动员身上测量获得
 """
+import json
 import numpy as np
 
 # 这些数据需要从真实的专业泰拳运动员视频中提取
 class RealReferencePoses:
-    def __init__(self):
+    def __init__(self, standards_path=None):
         # 注意：这些数值需要从实际数据中统计得出
         self.professional_standards = {
             "jab": {
@@ -48,6 +49,29 @@ class RealReferencePoses:
                 }
             }
         }
+        
+        # 由 standards_builder.py 从专业视频库统计生成的标准文件，覆盖上面的手工数值
+        self.standards_version = None
+        if standards_path:
+            self.load_standards(standards_path)
+    
+    def load_standards(self, standards_path):
+        """加载带版本号的专业标准文件，按技术和指标组整组覆盖现有数值"""
+        with open(standards_path) as f:
+            data = json.load(f)
+        
+        for technique, sections in data["standards"].items():
+            technique_standards = self.professional_standards.setdefault(technique, {})
+            for section, metrics in sections.items():
+                # 样本太少时标准差为0，无法计算偏差分数；整组保留原值，避免新旧数值混用
+                unusable = [metric for metric, values in metrics.items() if values["std"] <= 0]
+                if unusable:
+                    print(f"标准文件 v{data['version']}: {technique}.{section} 中 {', '.join(unusable)} "
+                          f"标准差为0，保留原有的 {section}")
+                    continue
+                technique_standards[section] = metrics
+        
+        self.standards_version = data["version"]
     
     def get_technique_standards(self, technique_name):
         """获取特定技术的专业标准"""
@@ -0,0 +1,171 @@
+"""
+专业动作重复的最近邻索引：定长嵌入做候选检索，带状 DTW（LB_Keogh 下界剪枝）重排序并给出逐帧对齐偏差
+"""
+import numpy as np
+import joblib
+from sklearn.neighbors import NearestNeighbors
+from typing import List, Dict, Iterable, Tuple
+from pose_arrays import sequence_to_array, joint_angles, resample_positions, resample_series, JOINT_ANGLES
+from stance_normalizer import StanceNormalizer
+
+FEATURE_NAMES = [joint[0] for joint in JOINT_ANGLES]
+
+
+class ReferenceRepetitionIndex:
+    def __init__(self, embedding_length: int = 16, dtw_length: int = 64, band_ratio: float = 0.1,
+                 num_candidates: int = 50):
+        self.embedding_length = embedding_length    # frames per repetition in the retrieval embedding
+        self.dtw_length = dtw_length                # frames per repetition compared with DTW
+        self.band_ratio = band_ratio                # Sakoe-Chiba band as a fraction of dtw_length
+        self.num_candidates = num_candidates
+        self.repetitions = {}                       # technique -> list of stored repetitions
+        self.neighbors = {}                         # technique -> fitted NearestNeighbors
+        self.stance_normalizer = StanceNormalizer()
+
+    def add_repetition(self, technique: str, pose_sequence: List[Dict], metadata: Dict = None) -> bool:
+        """Add one professional repetition; call build() afterwards"""
+        # Compare southpaw and orthodox repetitions in the same orientation
+        pose_sequence, _ = self.stance_normalizer.normalize(pose_sequence)
+        prepared = self._prepare(pose_sequence)
+        if prepared is None:
+            return False
+
+        prepared['metadata'] = metadata or {}
+        self.repetitions.setdefault(technique, []).append(prepared)
+        return True
+
+    def build_from_archive(self, archive: Iterable[Tuple[str, List[Dict], Dict]]):
+        """Add (technique, pose_sequence, metadata) items from the professional archive and build"""
+        added = sum(self.add_repetition(technique, pose_sequence, metadata)
+                    for technique, pose_sequence, metadata in archive)
+        self.build()
+        print(f"Reference index built from {added} repetitions")
+
+    def build(self):
+        """Fit the per-technique retrieval index over the stored embeddings"""
+        self.neighbors = {}
+        for technique, repetitions in self.repetitions.items():
+            embeddings = np.stack([rep['embedding'] for rep in repetitions])
+            self.neighbors[technique] = NearestNeighbors(
+                n_neighbors=min(self.num_candidates, len(repetitions))
+            ).fit(embeddings)
+
+    def find_closest(self, pose_sequence: List[Dict], technique: str, k: int = 3) -> List[Dict]:
+        """Closest professional repetitions by DTW distance; pose_sequence must already be stance-normalized"""
+        if technique not in self.neighbors:
+            return []
+        prepared = self._prepare(pose_sequence)
+        if prepared is None:
+            return []
+
+        repetitions = self.repetitions[technique]
+        _, candidate_ids = self.neighbors[technique].kneighbors([prepared['embedding']])
+        candidate_ids = candidate_ids[0]
+
+        query = prepared['series']
+        window = max(1, int(self.band_ratio * self.dtw_length))
+        references = np.stack([repetitions[i]['series'] for i in candidate_ids])
+
+        # Visit candidates in lower-bound order and stop once no bound can beat the current top k
+        lower_bounds = self._lb_keogh(query, references, window)
+        order = np.argsort(lower_bounds)
+        best = []
+        for start in range(0, len(order), k):
+            batch = order[start:start + k]
+            if len(best) >= k and lower_bounds[batch[0]] >= best[k - 1][0]:
+                break
+            costs = self._dtw_costs(query, references[batch], window)
+            best.extend((float(costs[b, -1, -1]), int(batch[b]), costs[b]) for b in range(len(batch)))
+            best.sort(key=lambda item: item[0])
+            best = best[:k]
+
+        matches = []
+        for distance, position, cost in best:
+            repetition = repetitions[candidate_ids[position]]
+            path = self._backtrack(cost)
+            deviations = repetition['series'][path[:, 1]] - query[path[:, 0]]
+            matches.append({
+                'metadata': repetition['metadata'],
+                'dtw_distance': round(distance, 3),
+                'alignment': [
+                    {'user_frame': int(prepared['frames'][i]), 'reference_frame': int(repetition['frames'][j])}
+                    for i, j in path
+                ],
+                'mean_deviation': {
+                    name: round(float(value), 1)
+                    for name, value in zip(FEATURE_NAMES, np.abs(deviations).mean(axis=0))
+                },
+                'frame_deviations': np.round(deviations, 1).tolist()
+            })
+        return matches
+
+    def _prepare(self, pose_sequence: List[Dict]):
+        """Joint-angle series resampled to the DTW and embedding lengths"""
+        frame_indices, _, landmarks = sequence_to_array(pose_sequence)
+        if len(frame_indices) < 2:
+            return None
+
+        angles = joint_angles(landmarks)
+        series = resample_series(angles, self.dtw_length)
+        positions = np.rint(resample_positions(len(frame_indices), self.dtw_length)).astype(np.int64)
+        return {
+            'series': series,
+            'frames': frame_indices[positions],
+            'embedding': resample_series(angles, self.embedding_length).ravel() / 180.0
+        }
+
+    def _lb_keogh(self, query: np.ndarray, references: np.ndarray, window: int) -> np.ndarray:
+        """LB_Keogh lower bound of the banded DTW distance for every reference"""
+        padded = np.pad(query, ((window, window), (0, 0)), mode='edge')
+        windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1, axis=0)
+        upper = windows.max(axis=2)
+        lower = windows.min(axis=2)
+        above = np.maximum(references - upper, 0)
+        below = np.maximum(lower - references, 0)
+        return np.sum(above ** 2 + below ** 2, axis=(1, 2))
+
+    def _dtw_costs(self, query: np.ndarray, references: np.ndarray, window: int) -> np.ndarray:
+        """Banded DTW cumulative cost matrices, computed for a batch of references at once"""
+        n, m = len(query), references.shape[1]
+        distances = np.sum((query[None, :, None, :] - references[:, None, :, :]) ** 2, axis=3)
+
+        costs = np.full((len(references), n + 1, m + 1), np.inf)
+        costs[:, 0, 0] = 0.0
+        for i in range(1, n + 1):
+            for j in range(max(1, i - window), min(m, i + window) + 1):
+                costs[:, i, j] = distances[:, i - 1, j - 1] + np.minimum(
+                    np.minimum(costs[:, i - 1, j - 1], costs[:, i - 1, j]), costs[:, i, j - 1]
+                )
+        return costs
+
+    def _backtrack(self, cost: np.ndarray) -> np.ndarray:
+        """Warping path as (query position, reference position) pairs"""
+        i, j = cost.shape[0] - 1, cost.shape[1] - 1
+        path = []
+        while i > 0 and j > 0:
+            path.append((i - 1, j - 1))
+            step = np.argmin([cost[i - 1, j - 1], cost[i - 1, j], cost[i, j - 1]])
+            if step == 0:
+                i, j = i - 1, j - 1
+            elif step == 1:
+                i -= 1
+            else:
+                j -= 1
+        return np.array(path[::-1])
+
+    def save(self, path: str):
+        joblib.dump({'config': (self.embedding_length, self.dtw_length, self.band_ratio, self.num_candidates),
+                     'repetitions': self.repetitions}, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ReferenceRepetitionIndex':
+        data = joblib.load(path)
+        index = cls(*data['config'])
+        index.repetitions = data['repetitions']
+        index.build()
+        return index
+
+# Example usage
+reference_index = ReferenceRepetitionIndex()
+print("Reference repetition index initialized!")
+print("Compared joint angles:", FEATURE_NAMES)
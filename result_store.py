@@ -0,0 +1,219 @@
+"""
+分析结果的本地存储，写入时同步维护每个用户的汇总数据，供 journey / reports 页面直接查询
+"""
+import json
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+SCORE_FIELDS = ('overall', 'form', 'chain_of_power', 'explosiveness')
+
+# Aggregate rows keyed with this technique cover every technique of the user
+ALL_TECHNIQUES = '*'
+
+SECONDS_PER_DAY = 86400
+
+
+class AnalysisResultStore:
+    def __init__(self, db_path: str = 'analysis_results.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create result and aggregate tables if they do not exist yet"""
+        score_columns = ', '.join(f'{field} REAL NOT NULL' for field in SCORE_FIELDS)
+        sum_columns = ', '.join(f'sum_{field} REAL NOT NULL DEFAULT 0' for field in SCORE_FIELDS)
+        best_columns = ', '.join(f'best_{field} REAL' for field in SCORE_FIELDS)
+
+        with self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    technique TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    {score_columns},
+                    payload TEXT NOT NULL
+                )
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_user_time "
+                "ON analysis_results (user_id, created_at)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_results_user_technique_time "
+                "ON analysis_results (user_id, technique, created_at)"
+            )
+
+            # Running totals per user and technique
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS user_aggregates (
+                    user_id TEXT NOT NULL,
+                    technique TEXT NOT NULL,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    {sum_columns},
+                    {best_columns},
+                    first_at REAL,
+                    last_at REAL,
+                    PRIMARY KEY (user_id, technique)
+                )
+            """)
+
+            # Daily buckets so timeframe queries read at most one row per day
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS user_daily_aggregates (
+                    user_id TEXT NOT NULL,
+                    technique TEXT NOT NULL,
+                    day INTEGER NOT NULL,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    {sum_columns},
+                    PRIMARY KEY (user_id, technique, day)
+                )
+            """)
+
+    def save_result(self, user_id: str, analysis_result: Dict, created_at: float = None) -> int:
+        """Store an analysis result and update the user's aggregates in one transaction"""
+        if not analysis_result.get('success'):
+            raise ValueError('Only successful analysis results can be stored')
+
+        if created_at is None:
+            created_at = time.time()
+
+        technique = analysis_result['technique']['name']
+        scores = [float(analysis_result['scores'][field]) for field in SCORE_FIELDS]
+        day = int(created_at // SECONDS_PER_DAY)
+
+        with self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO analysis_results (user_id, technique, created_at, "
+                f"{', '.join(SCORE_FIELDS)}, payload) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in SCORE_FIELDS)}, ?)",
+                [user_id, technique, created_at, *scores, json.dumps(analysis_result, default=float)]
+            )
+
+            for aggregate_technique in (technique, ALL_TECHNIQUES):
+                self._update_totals(user_id, aggregate_technique, scores, created_at)
+                self._update_daily(user_id, aggregate_technique, day, scores)
+
+        return cursor.lastrowid
+
+    def _update_totals(self, user_id: str, technique: str, scores: List[float], created_at: float):
+        """Fold one result into the running totals row"""
+        sum_updates = ', '.join(f'sum_{field} = sum_{field} + excluded.sum_{field}'
+                                for field in SCORE_FIELDS)
+        best_updates = ', '.join(f'best_{field} = MAX(best_{field}, excluded.best_{field})'
+                                 for field in SCORE_FIELDS)
+        self.conn.execute(
+            f"INSERT INTO user_aggregates (user_id, technique, session_count, "
+            f"{', '.join(f'sum_{field}' for field in SCORE_FIELDS)}, "
+            f"{', '.join(f'best_{field}' for field in SCORE_FIELDS)}, first_at, last_at) "
+            f"VALUES (?, ?, 1, {', '.join('?' for _ in range(2 * len(SCORE_FIELDS)))}, ?, ?) "
+            f"ON CONFLICT (user_id, technique) DO UPDATE SET "
+            f"session_count = session_count + 1, {sum_updates}, {best_updates}, "
+            f"first_at = MIN(first_at, excluded.first_at), "
+            f"last_at = MAX(last_at, excluded.last_at)",
+            [user_id, technique, *scores, *scores, created_at, created_at]
+        )
+
+    def _update_daily(self, user_id: str, technique: str, day: int, scores: List[float]):
+        """Fold one result into its daily bucket"""
+        sum_updates = ', '.join(f'sum_{field} = sum_{field} + excluded.sum_{field}'
+                                for field in SCORE_FIELDS)
+        self.conn.execute(
+            f"INSERT INTO user_daily_aggregates (user_id, technique, day, session_count, "
+            f"{', '.join(f'sum_{field}' for field in SCORE_FIELDS)}) "
+            f"VALUES (?, ?, ?, 1, {', '.join('?' for _ in SCORE_FIELDS)}) "
+            f"ON CONFLICT (user_id, technique, day) DO UPDATE SET "
+            f"session_count = session_count + 1, {sum_updates}",
+            [user_id, technique, day, *scores]
+        )
+
+    def get_user_summary(self, user_id: str, technique: str = None) -> Optional[Dict]:
+        """Lifetime averages and best scores for a user, optionally for one technique"""
+        row = self.conn.execute(
+            "SELECT * FROM user_aggregates WHERE user_id = ? AND technique = ?",
+            [user_id, technique or ALL_TECHNIQUES]
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        count = row['session_count']
+        return {
+            'technique': technique,
+            'session_count': count,
+            'average_scores': {field: round(row[f'sum_{field}'] / count, 1) for field in SCORE_FIELDS},
+            'best_scores': {field: round(row[f'best_{field}']) for field in SCORE_FIELDS},
+            'first_session': row['first_at'],
+            'last_session': row['last_at']
+        }
+
+    def get_progress(self, user_id: str, days: int, technique: str = None,
+                     bucket_days: int = 7, now: float = None) -> List[Dict]:
+        """Average scores per period over the last `days` days, read from the daily buckets"""
+        if now is None:
+            now = time.time()
+        today = int(now // SECONDS_PER_DAY)
+        first_day = today - days + 1
+
+        sum_columns = ', '.join(f'SUM(sum_{field}) AS sum_{field}' for field in SCORE_FIELDS)
+        rows = self.conn.execute(
+            f"SELECT (day - ?) / ? AS bucket, SUM(session_count) AS session_count, {sum_columns} "
+            f"FROM user_daily_aggregates "
+            f"WHERE user_id = ? AND technique = ? AND day BETWEEN ? AND ? "
+            f"GROUP BY bucket ORDER BY bucket",
+            [first_day, bucket_days, user_id, technique or ALL_TECHNIQUES, first_day, today]
+        ).fetchall()
+
+        progress = []
+        for row in rows:
+            count = row['session_count']
+            progress.append({
+                'period_start': (first_day + row['bucket'] * bucket_days) * SECONDS_PER_DAY,
+                'session_count': count,
+                'average_scores': {field: round(row[f'sum_{field}'] / count, 1) for field in SCORE_FIELDS}
+            })
+        return progress
+
+    def get_recent_results(self, user_id: str, technique: str = None, limit: int = 10) -> List[Dict]:
+        """Most recent sessions for a user, newest first"""
+        query = (f"SELECT id, technique, created_at, {', '.join(SCORE_FIELDS)} "
+                 f"FROM analysis_results WHERE user_id = ?")
+        params = [user_id]
+        if technique:
+            query += " AND technique = ?"
+            params.append(technique)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                'id': row['id'],
+                'technique': row['technique'],
+                'created_at': row['created_at'],
+                'scores': {field: round(row[field]) for field in SCORE_FIELDS}
+            }
+            for row in self.conn.execute(query, params)
+        ]
+
+    def get_result(self, result_id: int) -> Optional[Dict]:
+        """Load the full analysis result stored under an id"""
+        row = self.conn.execute(
+            "SELECT payload FROM analysis_results WHERE id = ?", [result_id]
+        ).fetchone()
+        return json.loads(row['payload']) if row else None
+
+    def close(self):
+        self.conn.close()
+
+# Example usage
+result_store = AnalysisResultStore(':memory:')
+result_store.save_result('demo_user', {
+    'success': True,
+    'technique': {'name': 'jab', 'confidence': 0.9},
+    'scores': {'overall': 82, 'form': 85, 'chain_of_power': 78, 'explosiveness': 81}
+})
+print("Result store initialized!")
+print("Demo user summary:", result_store.get_user_summary('demo_user'))
@@ -1,9 +1,26 @@
 import numpy as np
 from typing import Dict, List, Tuple
 import math
+from pose_arrays import sequence_to_array, joint_angles
 
 class MuayThaiScoringEngine:
-    def __init__(self):
+    def __init__(self, reference_index=None, reference_standards=None):
+        # Optional ReferenceRepetitionIndex built from professional repetitions
+        self.reference_index = reference_index
+        
+        # Striking landmark per technique in the canonical orthodox orientation
+        self.striking_landmarks = {
+            'jab': 15,              # lead (left) wrist
+            'cross': 16,            # rear (right) wrist
+            'hook': 15,
+            'uppercut': 16,
+            'elbow_strike': 14,
+            'roundhouse_kick': 28,  # rear (right) ankle
+            'teep': 27,             # lead (left) ankle
+            'knee_strike': 26,
+            None: 16
+        }
+        
         # Professional reference poses for comparison
         self.reference_poses = {
             'jab': {
@@ -23,32 +40,58 @@ class MuayThaiScoringEngine:
                 }
             }
         }
+        
+        # Form thresholds: target angle with (good, fair) tolerances in degrees, acceptable ranges
+        self.form_thresholds = {
+            'jab': {
+                'lead_arm_extension': {
+                    'target': self.reference_poses['jab']['key_angles']['lead_arm_extension'],
+                    'tolerances': (10, 20)
+                },
+                'stance_width': {'range': (0.2, 0.4)}
+            },
+            'roundhouse_kick': {
+                'kicking_leg_knee': {
+                    'target': self.reference_poses['roundhouse_kick']['key_angles']['kicking_leg_angle'],
+                    'tolerances': (10, 20)
+                }
+            }
+        }
+        # Optional RealReferencePoses, e.g. loaded from a standards file built by standards_builder.py
+        if reference_standards is not None:
+            self.load_form_thresholds(reference_standards)
+    
+    def load_form_thresholds(self, reference_standards):
+        """Replace the hand-typed form thresholds with measured professional statistics"""
+        for technique, thresholds in self.form_thresholds.items():
+            optimal_angles = reference_standards.get_technique_standards(technique).get('optimal_angles', {})
+            for metric, threshold in thresholds.items():
+                standard = optimal_angles.get(metric)
+                if not standard:
+                    continue
+                if 'target' in threshold:
+                    # Within one standard deviation is good, within two is fair
+                    threshold['target'] = standard['mean']
+                    threshold['tolerances'] = (standard['std'], 2 * standard['std'])
+                else:
+                    threshold['range'] = tuple(standard['range'])
     
     def calculate_form_score(self, pose_sequence: List[Dict], technique: str) -> Dict:
-        """Calculate form score based on pose analysis"""
+        """Calculate form score based on pose analysis (sequence in canonical orthodox orientation)"""
         if technique not in self.reference_poses:
             return {'score': 0, 'feedback': 'Technique not recognized'}
         
         reference = self.reference_poses[technique]
-        form_scores = []
-        detailed_feedback = []
+        _, _, landmarks = sequence_to_array(pose_sequence)
         
-        for frame_data in pose_sequence:
-            landmarks = frame_data['landmarks']
-            frame_score = 0
+        if len(landmarks) > 0:
+            # Analyze key body positions for all frames at once
+            if technique == 'jab':
+                form_scores, detailed_feedback = self._analyze_jab_form(landmarks, reference)
+            else:
+                form_scores, detailed_feedback = self._analyze_kick_form(landmarks, reference)
             
-            if len(landmarks) >= 33:
-                # Analyze key body positions
-                if technique == 'jab':
-                    frame_score, feedback = self._analyze_jab_form(landmarks, reference)
-                elif technique == 'roundhouse_kick':
-                    frame_score, feedback = self._analyze_kick_form(landmarks, reference)
-                
-                form_scores.append(frame_score)
-                detailed_feedback.extend(feedback)
-        
-        # Calculate overall form score
-        if form_scores:
+            # Calculate overall form score
             avg_score = np.mean(form_scores)
             # Normalize to 0-100 scale
             final_score = min(100, max(0, avg_score))
@@ -56,30 +99,23 @@ class MuayThaiScoringEngine:
             return {
                 'score': round(final_score),
                 'feedback': self._generate_form_feedback(detailed_feedback, final_score),
-                'frame_scores': form_scores
+                'frame_scores': form_scores.tolist()
             }
         
         return {'score': 0, 'feedback': 'Unable to analyze form'}
     
     def calculate_chain_of_power_score(self, pose_sequence: List[Dict], technique: str) -> Dict:
         """Calculate kinetic chain efficiency score"""
-        power_scores = []
+        _, _, landmarks = sequence_to_array(pose_sequence)
         
-        for i in range(1, len(pose_sequence)):
-            prev_frame = pose_sequence[i-1]['landmarks']
-            curr_frame = pose_sequence[i]['landmarks']
+        if len(landmarks) >= 2:
+            # Analyze power generation sequence between consecutive frames
+            hip_rotation = self._calculate_hip_rotation(landmarks)
+            shoulder_engagement = self._calculate_shoulder_movement(landmarks)
+            weight_transfer = self._calculate_weight_transfer(landmarks)
             
-            if len(prev_frame) >= 33 and len(curr_frame) >= 33:
-                # Analyze power generation sequence
-                hip_rotation = self._calculate_hip_rotation(prev_frame, curr_frame)
-                shoulder_engagement = self._calculate_shoulder_movement(prev_frame, curr_frame)
-                weight_transfer = self._calculate_weight_transfer(prev_frame, curr_frame)
-                
-                # Combine power metrics
-                power_score = (hip_rotation * 0.4 + shoulder_engagement * 0.3 + weight_transfer * 0.3)
-                power_scores.append(power_score)
-        
-        if power_scores:
+            # Combine power metrics
+            power_scores = hip_rotation * 0.4 + shoulder_engagement * 0.3 + weight_transfer * 0.3
             avg_power = np.mean(power_scores)
             final_score = min(100, max(0, avg_power * 100))
             
@@ -87,45 +123,25 @@ class MuayThaiScoringEngine:
                 'score': round(final_score),
                 'feedback': self._generate_power_feedback(final_score),
                 'components': {
-                    'hip_rotation': round(np.mean([self._calculate_hip_rotation(
-                        pose_sequence[i-1]['landmarks'], pose_sequence[i]['landmarks']
-                    ) for i in range(1, len(pose_sequence))]) * 100),
-                    'shoulder_engagement': round(np.mean([self._calculate_shoulder_movement(
-                        pose_sequence[i-1]['landmarks'], pose_sequence[i]['landmarks']
-                    ) for i in range(1, len(pose_sequence))]) * 100),
-                    'weight_transfer': round(np.mean([self._calculate_weight_transfer(
-                        pose_sequence[i-1]['landmarks'], pose_sequence[i]['landmarks']
-                    ) for i in range(1, len(pose_sequence))]) * 100)
+                    'hip_rotation': round(np.mean(hip_rotation) * 100),
+                    'shoulder_engagement': round(np.mean(shoulder_engagement) * 100),
+                    'weight_transfer': round(np.mean(weight_transfer) * 100)
                 }
             }
         
         return {'score': 0, 'feedback': 'Unable to analyze power chain'}
     
-    def calculate_explosiveness_score(self, pose_sequence: List[Dict]) -> Dict:
+    def calculate_explosiveness_score(self, pose_sequence: List[Dict], technique: str = None) -> Dict:
         """Calculate speed and explosiveness score"""
-        velocities = []
-        accelerations = []
+        _, timestamps, landmarks = sequence_to_array(pose_sequence)
         
-        # Calculate hand/foot velocities
-        for i in range(2, len(pose_sequence)):
-            dt = pose_sequence[i]['timestamp'] - pose_sequence[i-1]['timestamp']
-            if dt > 0:
-                # Calculate velocity of striking limb
-                velocity = self._calculate_limb_velocity(
-                    pose_sequence[i-2]['landmarks'],
-                    pose_sequence[i-1]['landmarks'],
-                    pose_sequence[i]['landmarks'],
-                    dt
-                )
-                velocities.append(velocity)
-                
-                if len(velocities) >= 2:
-                    acceleration = (velocities[-1] - velocities[-2]) / dt
-                    accelerations.append(abs(acceleration))
+        # Calculate velocity of the striking hand/foot
+        velocities, dt = self._calculate_limb_velocity(landmarks, timestamps, technique)
         
-        if velocities:
-            max_velocity = max(velocities)
-            avg_acceleration = np.mean(accelerations) if accelerations else 0
+        if len(velocities) > 0:
+            accelerations = np.abs(np.diff(velocities)) / dt[1:]
+            max_velocity = float(np.max(velocities))
+            avg_acceleration = float(np.mean(accelerations)) if len(accelerations) else 0
             
             # Normalize and combine metrics
             velocity_score = min(100, max_velocity * 1000)  # Scale factor
@@ -142,127 +158,101 @@ class MuayThaiScoringEngine:
         
         return {'score': 0, 'feedback': 'Unable to analyze explosiveness'}
     
-    def _analyze_jab_form(self, landmarks: List[Dict], reference: Dict) -> Tuple[float, List[str]]:
-        """Analyze jab-specific form"""
-        score = 0
-        feedback = []
-        
-        # Check arm extension
-        left_shoulder = np.array([landmarks[11]['x'], landmarks[11]['y']])
-        left_elbow = np.array([landmarks[13]['x'], landmarks[13]['y']])
-        left_wrist = np.array([landmarks[15]['x'], landmarks[15]['y']])
+    def compare_to_professionals(self, pose_sequence: List[Dict], technique: str, k: int = 3) -> Dict:
+        """Find the closest professional repetitions and frame-aligned deviations"""
+        if self.reference_index is None:
+            return {'matches': [], 'feedback': 'No professional reference index loaded'}
         
-        arm_angle = self._calculate_angle_3points(left_shoulder, left_elbow, left_wrist)
-        target_angle = reference['key_angles']['lead_arm_extension']
+        matches = self.reference_index.find_closest(pose_sequence, technique, k)
+        if not matches:
+            return {'matches': [], 'feedback': 'No professional repetitions available for this technique'}
         
-        angle_diff = abs(arm_angle - target_angle)
-        if angle_diff < 10:
-            score += 25
-            feedback.append("Good arm extension")
-        elif angle_diff < 20:
-            score += 15
-            feedback.append("Arm extension needs slight adjustment")
-        else:
-            score += 5
-            feedback.append("Improve arm extension")
-        
-        # Check stance and balance
-        left_hip = np.array([landmarks[23]['x'], landmarks[23]['y']])
-        right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-        stance_width = abs(left_hip[0] - right_hip[0])
-        
-        if 0.2 < stance_width < 0.4:
-            score += 25
-            feedback.append("Good stance width")
-        else:
-            score += 10
-            feedback.append("Adjust stance width")
-        
-        return score, feedback
+        # Largest average joint-angle deviation from the closest professional
+        worst_joint, worst_deviation = max(matches[0]['mean_deviation'].items(), key=lambda item: item[1])
+        return {
+            'matches': matches,
+            'feedback': f"Closest to professional repetition; largest difference at {worst_joint.replace('_', ' ')} "
+                        f"({worst_deviation:.0f}° on average)"
+        }
     
-    def _analyze_kick_form(self, landmarks: List[Dict], reference: Dict) -> Tuple[float, List[str]]:
-        """Analyze kick-specific form"""
-        score = 0
-        feedback = []
+    def _analyze_jab_form(self, landmarks: np.ndarray, reference: Dict) -> Tuple[np.ndarray, List[str]]:
+        """Analyze jab-specific form for every frame"""
+        thresholds = self.form_thresholds['jab']
         
-        # Check kicking leg position
-        right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-        right_knee = np.array([landmarks[26]['x'], landmarks[26]['y']])
-        right_ankle = np.array([landmarks[28]['x'], landmarks[28]['y']])
+        # Check lead (left) arm extension
+        arm_angle = joint_angles(landmarks, [('lead_arm', 11, 13, 15)])[:, 0]
+        arm_threshold = thresholds['lead_arm_extension']
+        good, fair = arm_threshold['tolerances']
         
-        leg_angle = self._calculate_angle_3points(right_hip, right_knee, right_ankle)
+        angle_diff = np.abs(arm_angle - arm_threshold['target'])
+        arm_conditions = [angle_diff < good, angle_diff < fair]
+        arm_score = np.select(arm_conditions, [25, 15], 5)
+        arm_feedback = np.select(arm_conditions, ["Good arm extension", "Arm extension needs slight adjustment"],
+                                 "Improve arm extension")
         
-        if 80 < leg_angle < 100:
-            score += 30
-            feedback.append("Excellent leg position")
-        elif 70 < leg_angle < 110:
-            score += 20
-            feedback.append("Good leg position")
-        else:
-            score += 10
-            feedback.append("Adjust leg angle")
+        # Check stance and balance
+        stance_width = np.abs(landmarks[:, 23, 0] - landmarks[:, 24, 0])
+        low, high = thresholds['stance_width']['range']
+        good_stance = (low < stance_width) & (stance_width < high)
+        stance_score = np.where(good_stance, 25, 10)
+        stance_feedback = np.where(good_stance, "Good stance width", "Adjust stance width")
         
-        return score, feedback
+        feedback = np.stack([arm_feedback, stance_feedback], axis=1).ravel().tolist()
+        return arm_score + stance_score, feedback
     
-    def _calculate_angle_3points(self, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> float:
-        """Calculate angle between three points"""
-        v1 = p1 - p2
-        v2 = p3 - p2
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-        return np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
-    
-    def _calculate_hip_rotation(self, prev_landmarks: List[Dict], curr_landmarks: List[Dict]) -> float:
-        """Calculate hip rotation between frames"""
-        prev_left_hip = np.array([prev_landmarks[23]['x'], prev_landmarks[23]['y']])
-        prev_right_hip = np.array([prev_landmarks[24]['x'], prev_landmarks[24]['y']])
-        curr_left_hip = np.array([curr_landmarks[23]['x'], curr_landmarks[23]['y']])
-        curr_right_hip = np.array([curr_landmarks[24]['x'], curr_landmarks[24]['y']])
+    def _analyze_kick_form(self, landmarks: np.ndarray, reference: Dict) -> Tuple[np.ndarray, List[str]]:
+        """Analyze kick-specific form for every frame"""
+        # Check rear (right) kicking leg position
+        leg_angle = joint_angles(landmarks, [('kicking_leg', 24, 26, 28)])[:, 0]
+        leg_threshold = self.form_thresholds['roundhouse_kick']['kicking_leg_knee']
+        excellent, good = leg_threshold['tolerances']
         
-        prev_hip_vector = prev_right_hip - prev_left_hip
-        curr_hip_vector = curr_right_hip - curr_left_hip
+        angle_diff = np.abs(leg_angle - leg_threshold['target'])
+        leg_conditions = [angle_diff < excellent, angle_diff < good]
+        score = np.select(leg_conditions, [30, 20], 10)
+        feedback = np.select(leg_conditions, ["Excellent leg position", "Good leg position"], "Adjust leg angle")
+        return score, feedback.tolist()
+    
+    def _calculate_hip_rotation(self, landmarks: np.ndarray) -> np.ndarray:
+        """Calculate hip rotation between consecutive frames"""
+        hip_vectors = landmarks[:, 24, :2] - landmarks[:, 23, :2]
+        prev_hip_vector, curr_hip_vector = hip_vectors[:-1], hip_vectors[1:]
         
         # Calculate rotation angle
-        cos_angle = np.dot(prev_hip_vector, curr_hip_vector) / (
-            np.linalg.norm(prev_hip_vector) * np.linalg.norm(curr_hip_vector)
-        )
-        rotation = abs(np.degrees(np.arccos(np.clip(cos_angle, -1, 1))))
+        norms = np.linalg.norm(prev_hip_vector, axis=1) * np.linalg.norm(curr_hip_vector, axis=1)
+        cos_angle = np.sum(prev_hip_vector * curr_hip_vector, axis=1) / np.maximum(norms, 1e-9)
+        rotation = np.abs(np.degrees(np.arccos(np.clip(cos_angle, -1, 1))))
         
-        return min(1.0, rotation / 45.0)  # Normalize to 0-1
+        return np.minimum(1.0, rotation / 45.0)  # Normalize to 0-1
     
-    def _calculate_shoulder_movement(self, prev_landmarks: List[Dict], curr_landmarks: List[Dict]) -> float:
-        """Calculate shoulder engagement"""
-        prev_left_shoulder = np.array([prev_landmarks[11]['x'], prev_landmarks[11]['y']])
-        prev_right_shoulder = np.array([prev_landmarks[12]['x'], prev_landmarks[12]['y']])
-        curr_left_shoulder = np.array([curr_landmarks[11]['x'], curr_landmarks[11]['y']])
-        curr_right_shoulder = np.array([curr_landmarks[12]['x'], curr_landmarks[12]['y']])
-        
-        left_movement = np.linalg.norm(curr_left_shoulder - prev_left_shoulder)
-        right_movement = np.linalg.norm(curr_right_shoulder - prev_right_shoulder)
-        
-        total_movement = left_movement + right_movement
-        return min(1.0, total_movement * 10)  # Scale and normalize
+    def _calculate_shoulder_movement(self, landmarks: np.ndarray) -> np.ndarray:
+        """Calculate shoulder engagement between consecutive frames"""
+        shoulders = landmarks[:, [11, 12], :2]
+        total_movement = np.linalg.norm(np.diff(shoulders, axis=0), axis=2).sum(axis=1)
+        return np.minimum(1.0, total_movement * 10)  # Scale and normalize
     
-    def _calculate_weight_transfer(self, prev_landmarks: List[Dict], curr_landmarks: List[Dict]) -> float:
-        """Calculate weight transfer efficiency"""
+    def _calculate_weight_transfer(self, landmarks: np.ndarray) -> np.ndarray:
+        """Calculate weight transfer efficiency between consecutive frames"""
         # Simplified weight transfer calculation based on center of mass movement
-        prev_com_x = (prev_landmarks[23]['x'] + prev_landmarks[24]['x']) / 2
-        curr_com_x = (curr_landmarks[23]['x'] + curr_landmarks[24]['x']) / 2
-        
-        weight_shift = abs(curr_com_x - prev_com_x)
-        return min(1.0, weight_shift * 5)  # Scale and normalize
+        com_x = landmarks[:, [23, 24], 0].mean(axis=1)
+        weight_shift = np.abs(np.diff(com_x))
+        return np.minimum(1.0, weight_shift * 5)  # Scale and normalize
     
-    def _calculate_limb_velocity(self, landmarks1: List[Dict], landmarks2: List[Dict], 
-                                landmarks3: List[Dict], dt: float) -> float:
-        """Calculate velocity of striking limb"""
-        # Use right hand for punches, right foot for kicks
-        pos1 = np.array([landmarks1[16]['x'], landmarks1[16]['y']])  # Right wrist
-        pos2 = np.array([landmarks2[16]['x'], landmarks2[16]['y']])
-        pos3 = np.array([landmarks3[16]['x'], landmarks3[16]['y']])
+    def _calculate_limb_velocity(self, landmarks: np.ndarray, timestamps: np.ndarray,
+                                 technique: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Velocity of the striking limb at every frame with a positive time step, and those time steps"""
+        if len(landmarks) < 3:
+            return np.array([]), np.array([])
         
-        velocity1 = np.linalg.norm(pos2 - pos1) / dt
-        velocity2 = np.linalg.norm(pos3 - pos2) / dt
+        index = self.striking_landmarks.get(technique, self.striking_landmarks[None])
+        positions = landmarks[:, index, :2]
+        steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+        dt = np.diff(timestamps)[1:]
         
-        return max(velocity1, velocity2)
+        # Faster of the two steps around each frame
+        keep = dt > 0
+        velocities = np.maximum(steps[:-1], steps[1:])[keep] / dt[keep]
+        return velocities, dt[keep]
     
     def _generate_form_feedback(self, detailed_feedback: List[str], score: float) -> str:
         """Generate form feedback based on score"""
@@ -0,0 +1,91 @@
+"""
+站架/惯用侧归一化：每个序列只判断一次正架或反架，反架序列左右镜像成正架，评分和分类只需一条无分支的向量化路径
+"""
+import numpy as np
+from typing import List, Dict, Tuple
+from pose_arrays import sequence_to_array, NUM_LANDMARKS
+
+# MediaPipe left/right landmark pairs (eyes, ears, mouth, arms, hands, legs, feet)
+MIRROR_PAIRS = [(1, 4), (2, 5), (3, 6), (7, 8), (9, 10), (11, 12), (13, 14), (15, 16), (17, 18),
+                (19, 20), (21, 22), (23, 24), (25, 26), (27, 28), (29, 30), (31, 32)]
+
+MIRROR_INDICES = np.arange(NUM_LANDMARKS)
+for _left, _right in MIRROR_PAIRS:
+    MIRROR_INDICES[_left], MIRROR_INDICES[_right] = _right, _left
+
+# Pairs whose forward offset tells the lead side: wrists, knees, ankles
+STANCE_PAIRS = [(15, 16), (25, 26), (27, 28)]
+
+CANONICAL_STANCE = 'orthodox'
+
+
+class StanceNormalizer:
+    def __init__(self, min_lead_margin: float = 0.02):
+        # Smaller forward offsets are ambiguous and left as orthodox
+        self.min_lead_margin = min_lead_margin
+
+    def detect_stance(self, landmarks: np.ndarray) -> str:
+        """'orthodox' when the left side leads in the direction the fighter faces, else 'southpaw'"""
+        if len(landmarks) == 0:
+            return CANONICAL_STANCE
+
+        # Work in the ground plane (x, z) so any camera yaw works: facing the camera the lead
+        # side is closer (smaller z), filmed from the side it is further along x
+        ground = landmarks[:, :, [0, 2]]
+        shoulder_line = ground[:, 12] - ground[:, 11]
+        forward = np.stack([-shoulder_line[:, 1], shoulder_line[:, 0]], axis=1)
+        # The nose sits in front of the shoulders; orient the normal towards it
+        to_nose = ground[:, 0] - ground[:, [11, 12]].mean(axis=1)
+        forward *= np.where(np.sum(forward * to_nose, axis=1) < 0, -1.0, 1.0)[:, None]
+        forward /= np.maximum(np.linalg.norm(forward, axis=1), 1e-9)[:, None]
+
+        left = [pair[0] for pair in STANCE_PAIRS]
+        right = [pair[1] for pair in STANCE_PAIRS]
+        lead_offset = np.sum((ground[:, left] - ground[:, right]) * forward[:, None], axis=2)
+        left_lead = float(np.median(lead_offset.mean(axis=1)))
+        return 'southpaw' if left_lead < -self.min_lead_margin else CANONICAL_STANCE
+
+    def mirror(self, landmarks: np.ndarray) -> np.ndarray:
+        """Mirror [N, 33, 4] landmarks: swap left/right indices and flip normalized x"""
+        mirrored = landmarks[:, MIRROR_INDICES].copy()
+        mirrored[:, :, 0] = 1.0 - mirrored[:, :, 0]
+        return mirrored
+
+    def normalize_array(self, landmarks: np.ndarray) -> Tuple[np.ndarray, str]:
+        """Landmarks in the canonical orthodox orientation, plus the detected stance"""
+        stance = self.detect_stance(landmarks)
+        if stance == CANONICAL_STANCE:
+            return landmarks, stance
+        return self.mirror(landmarks), stance
+
+    def normalize(self, pose_sequence: List[Dict]) -> Tuple[List[Dict], str]:
+        """Pose sequence in the canonical orientation, plus the detected stance"""
+        _, _, landmarks = sequence_to_array(pose_sequence)
+        stance = self.detect_stance(landmarks)
+        if stance == CANONICAL_STANCE:
+            return pose_sequence, stance
+
+        # Keep per-frame fields such as 'interpolated'; only the landmarks change
+        mirrored = self.mirror(landmarks).tolist()
+        normalized = []
+        position = 0
+        for frame_data in pose_sequence:
+            if len(frame_data['landmarks']) >= NUM_LANDMARKS:
+                frame_data = dict(frame_data, landmarks=[
+                    {'x': x, 'y': y, 'z': z, 'visibility': visibility}
+                    for x, y, z, visibility in mirrored[position]
+                ])
+                position += 1
+            normalized.append(frame_data)
+        return normalized, stance
+
+# Example usage
+stance_normalizer = StanceNormalizer()
+print("Stance normalizer initialized!")
+# Facing the camera (nose closer than the shoulders) with the right side closer: southpaw
+demo_landmarks = np.zeros((10, NUM_LANDMARKS, 4))
+demo_landmarks[:, [0, 11, 12], 0] = [0.5, 0.6, 0.4]
+demo_landmarks[:, 0, 2] = -0.1
+demo_landmarks[:, [16, 26, 28], 2] = -0.2
+print("Demo stance:", stance_normalizer.detect_stance(demo_landmarks),
+      "-> after mirroring:", stance_normalizer.detect_stance(stance_normalizer.mirror(demo_landmarks)))
@@ -0,0 +1,301 @@
+"""
+从专业动作库流式构建参考标准：并行读取已存储的姿势序列，用可合并的单遍累加器（Welford / t-digest）统计各项指标，
+输出带版本号的标准文件；新增视频时只需处理新增部分
+"""
+import json
+import math
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple
+from pose_arrays import sequence_to_array, joint_angles
+from motion_events import MotionEventDetector, STRIKING_LIMBS
+
+# Metric names per striking limb, matching RealReferencePoses.professional_standards
+ARM_TECHNIQUES = {'jab', 'cross', 'hook', 'uppercut', 'elbow_strike'}
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
+
+class TDigest:
+    """Merging t-digest for streaming percentiles in bounded memory"""
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.means = np.array([])
+        self.weights = np.array([])
+        self.buffer = []
+
+    def add(self, value: float, weight: float = 1.0):
+        self.buffer.append((value, weight))
+        if len(self.buffer) >= 10 * self.compression:
+            self.compress()
+
+    def merge(self, other: 'TDigest'):
+        other.compress()
+        self.buffer.extend(zip(other.means.tolist(), other.weights.tolist()))
+        self.compress()
+
+    def compress(self):
+        """Fold buffered points into centroids sized by the arcsine scale function"""
+        if not self.buffer:
+            return
+        buffered = np.array(self.buffer)
+        means = np.concatenate([self.means, buffered[:, 0]])
+        weights = np.concatenate([self.weights, buffered[:, 1]])
+        self.buffer = []
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        new_means, new_weights = [], []
+        cumulative = 0.0
+        current_mean, current_weight = means[0], weights[0]
+        limit = self._k_inverse(self._k(0.0) + 1) * total
+        for mean, weight in zip(means[1:], weights[1:]):
+            if cumulative + current_weight + weight <= limit:
+                current_mean += (mean - current_mean) * weight / (current_weight + weight)
+                current_weight += weight
+            else:
+                new_means.append(current_mean)
+                new_weights.append(current_weight)
+                cumulative += current_weight
+                limit = self._k_inverse(self._k(cumulative / total) + 1) * total
+                current_mean, current_weight = mean, weight
+        new_means.append(current_mean)
+        new_weights.append(current_weight)
+
+        self.means = np.array(new_means)
+        self.weights = np.array(new_weights)
+
+    def quantile(self, q: float) -> float:
+        self.compress()
+        if len(self.means) == 0:
+            return float('nan')
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.weights.sum(), centers, self.means))
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def to_state(self) -> Dict:
+        self.compress()
+        return {'compression': self.compression, 'means': self.means.tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'TDigest':
+        digest = cls(state['compression'])
+        digest.means = np.array(state['means'])
+        digest.weights = np.array(state['weights'])
+        return digest
+
+
+class MetricAccumulator:
+    """Welford mean/variance plus a t-digest; two accumulators merge exactly (mean/std) or approximately (percentiles)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.digest = TDigest()
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.digest.add(value)
+
+    def merge(self, other: 'MetricAccumulator'):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.digest.merge(other.digest)
+
+    def summary(self) -> Dict:
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {
+            'mean': round(float(self.mean), 4),
+            'std': round(std, 4),
+            'range': [round(self.digest.quantile(0.10), 4), round(self.digest.quantile(0.90), 4)],
+            'percentiles': {str(p): round(self.digest.quantile(p / 100), 4) for p in PERCENTILES},
+            'count': self.count
+        }
+
+    def to_state(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'minimum': self.minimum, 'maximum': self.maximum, 'digest': self.digest.to_state()}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'MetricAccumulator':
+        accumulator = cls()
+        accumulator.count = state['count']
+        accumulator.mean = state['mean']
+        accumulator.m2 = state['m2']
+        accumulator.minimum = state['minimum']
+        accumulator.maximum = state['maximum']
+        accumulator.digest = TDigest.from_state(state['digest'])
+        return accumulator
+
+
+def measure_clip(pose_sequence: List[Dict], technique: str, detector: MotionEventDetector) -> Dict[str, Dict[str, float]]:
+    """Per-clip values of every standard metric, grouped like professional_standards"""
+    events = detector.detect_events(pose_sequence, technique)
+    if events is None:
+        return {}
+
+    frame_indices, timestamps, landmarks = sequence_to_array(pose_sequence)
+    position = {name: int(np.searchsorted(frame_indices, event['frame']))
+                for name, event in events['events'].items()}
+    side = 0 if events['striking_side'] == 'left' else 1
+    impact = position['max_extension']
+    strike = slice(position['start_of_motion'], position['return_to_guard'] + 1)
+
+    angles = joint_angles(landmarks[[impact]])[0]
+    hip_vector = landmarks[:, 24, :2] - landmarks[:, 23, :2]
+    hip_angle = np.degrees(np.unwrap(np.arctan2(hip_vector[:, 1], hip_vector[:, 0])))
+    dt = np.maximum(np.diff(timestamps), 1e-6)
+
+    # Speeds in torso lengths per second, the unit MotionEventDetector reports peak speed in
+    torso_length = max(float(np.median(np.linalg.norm(
+        landmarks[:, [11, 12], :2].mean(axis=1) - landmarks[:, [23, 24], :2].mean(axis=1), axis=1
+    ))), 1e-6)
+    end_point = STRIKING_LIMBS.get(technique, STRIKING_LIMBS['jab'])[0][side]
+    limb_speed = np.linalg.norm(np.diff(landmarks[:, end_point, :2], axis=0), axis=1) / dt / torso_length
+    limb_acceleration = np.abs(np.diff(limb_speed)) / dt[1:] if len(dt) > 1 else np.zeros(1)
+
+    # Elbow angles are JOINT_ANGLES columns 0/1, knees 6/7 (left/right)
+    if technique in ARM_TECHNIQUES:
+        optimal_angles = {
+            'lead_arm_extension': angles[side],
+            'rear_guard_elbow': angles[1 - side],
+            'hip_rotation': np.ptp(hip_angle[strike]),
+            'stance_width': float(np.median(np.abs(landmarks[:position['start_of_motion'] + 1, 23, 0]
+                                                   - landmarks[:position['start_of_motion'] + 1, 24, 0])))
+        }
+    else:
+        shoulder_center = landmarks[impact, [11, 12], :2].mean(axis=0)
+        hip_center = landmarks[impact, [23, 24], :2].mean(axis=0)
+        torso = shoulder_center - hip_center
+        optimal_angles = {
+            'kicking_leg_knee': angles[6 + side],
+            'supporting_leg_pivot': angles[7 - side],
+            'hip_rotation': np.ptp(hip_angle[strike]),
+            'torso_lean': np.degrees(np.arctan2(abs(torso[0]), abs(torso[1])))
+        }
+
+    return {
+        'optimal_angles': {name: float(value) for name, value in optimal_angles.items()},
+        'timing_patterns': {f"{phase['name']}_duration": phase['duration'] for phase in events['phases']},
+        'power_metrics': {
+            'peak_velocity': events['peak_speed'],
+            'acceleration': float(limb_acceleration.max()),
+            'rotational_speed': float(np.max(np.abs(np.diff(hip_angle)) / dt))
+        }
+    }
+
+
+def _process_shard(clips: List[Tuple[str, str]]) -> Dict:
+    """Worker entry point: stream clip files one at a time into per-metric accumulators"""
+    detector = MotionEventDetector()
+    accumulators = {}
+    for technique, path in clips:
+        with open(path) as f:
+            data = json.load(f)
+        pose_sequence = data['pose_sequence'] if isinstance(data, dict) else data
+        for section, metrics in measure_clip(pose_sequence, technique, detector).items():
+            for metric, value in metrics.items():
+                if math.isfinite(value):
+                    accumulators.setdefault((technique, section, metric), MetricAccumulator()).add(value)
+    return {'|'.join(key): accumulator.to_state() for key, accumulator in accumulators.items()}
+
+
+class ReferenceStandardsBuilder:
+    def __init__(self, archive_dir: str, output_dir: str = 'reference_standards', num_workers: int = None,
+                 shard_size: int = 50):
+        # archive_dir/<technique>/<clip>.json holds analyze_video output (or a bare pose_sequence)
+        self.archive_dir = archive_dir
+        self.output_dir = output_dir
+        self.num_workers = num_workers or os.cpu_count()
+        self.shard_size = shard_size
+        self.state_path = os.path.join(output_dir, 'builder_state.json')
+
+    def build(self) -> str:
+        """Process clips not seen by earlier builds and write the next standards version"""
+        state = self._load_state()
+        accumulators = {key: MetricAccumulator.from_state(value) for key, value in state['accumulators'].items()}
+        processed = set(state['processed_clips'])
+
+        new_clips = [clip for clip in self._list_clips() if os.path.relpath(clip[1], self.archive_dir) not in processed]
+        print(f"Processing {len(new_clips)} new clips ({len(processed)} already included)")
+
+        shards = [new_clips[i:i + self.shard_size] for i in range(0, len(new_clips), self.shard_size)]
+        if shards:
+            with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+                for partial in executor.map(_process_shard, shards):
+                    for key, value in partial.items():
+                        accumulators.setdefault(key, MetricAccumulator()).merge(MetricAccumulator.from_state(value))
+
+        processed.update(os.path.relpath(path, self.archive_dir) for _, path in new_clips)
+        version = state['version'] + 1
+        standards_path = self._write_standards(accumulators, version, len(processed))
+        self._save_state(accumulators, processed, version)
+        return standards_path
+
+    def _list_clips(self) -> List[Tuple[str, str]]:
+        clips = []
+        for technique in sorted(os.listdir(self.archive_dir)):
+            technique_dir = os.path.join(self.archive_dir, technique)
+            if os.path.isdir(technique_dir):
+                clips.extend((technique, os.path.join(technique_dir, name))
+                             for name in sorted(os.listdir(technique_dir)) if name.endswith('.json'))
+        return clips
+
+    def _write_standards(self, accumulators: Dict[str, MetricAccumulator], version: int, clip_count: int) -> str:
+        standards = {}
+        for key, accumulator in sorted(accumulators.items()):
+            technique, section, metric = key.split('|')
+            standards.setdefault(technique, {}).setdefault(section, {})[metric] = accumulator.summary()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'professional_standards_v{version}.json')
+        with open(path, 'w') as f:
+            json.dump({'version': version, 'created_at': time.time(), 'clip_count': clip_count,
+                       'standards': standards}, f, indent=2)
+        print(f"Wrote reference standards v{version} from {clip_count} clips to {path}")
+        return path
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'version': 0, 'processed_clips': [], 'accumulators': {}}
+
+    def _save_state(self, accumulators: Dict[str, MetricAccumulator], processed: set, version: int):
+        # Write to a temporary file first so a crash never leaves a half-written state
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump({'version': version, 'processed_clips': sorted(processed),
+                       'accumulators': {key: value.to_state() for key, value in accumulators.items()}}, f)
+        os.replace(temporary_path, self.state_path)
+
+# Example usage
+demo_accumulator = MetricAccumulator()
+for demo_value in np.random.default_rng(0).normal(165, 8, 1000):
+    demo_accumulator.add(demo_value)
+print("Reference standards builder ready!")
+print("Demo lead_arm_extension summary:", {k: v for k, v in demo_accumulator.summary().items() if k != 'percentiles'})
@@ -3,6 +3,8 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 import joblib
 from typing import List, Dict, Tuple
+from pose_arrays import sequence_to_array, joint_angles
+from stance_normalizer import StanceNormalizer
 
 class TechniqueClassifier:
     def __init__(self):
@@ -22,70 +24,40 @@ class TechniqueClassifier:
             6: 'elbow_strike',
             7: 'knee_strike'
         }
+        self.stance_normalizer = StanceNormalizer()
+        self.feature_joints = [
+            ('left_arm', 11, 13, 15),
+            ('right_arm', 12, 14, 16),
+            ('left_leg', 23, 25, 27),
+            ('right_leg', 24, 26, 28)
+        ]
     
     def extract_features(self, pose_sequence: List[Dict]) -> np.ndarray:
-        """Extract features from pose sequence for classification"""
-        if not pose_sequence:
+        """Extract features from a stance-normalized (orthodox) pose sequence for classification"""
+        _, _, landmarks = sequence_to_array(pose_sequence)
+        if len(landmarks) == 0:
             return np.array([])
         
-        features = []
+        # Key joint angles: arms (shoulder-elbow-wrist) and legs (hip-knee-ankle)
+        angles = joint_angles(landmarks, self.feature_joints)
         
-        for frame_data in pose_sequence:
-            landmarks = frame_data['landmarks']
-            frame_features = []
-            
-            # Extract key joint angles and positions
-            if len(landmarks) >= 33:  # MediaPipe has 33 landmarks
-                # Shoulder angles
-                left_shoulder = np.array([landmarks[11]['x'], landmarks[11]['y']])
-                right_shoulder = np.array([landmarks[12]['x'], landmarks[12]['y']])
-                left_elbow = np.array([landmarks[13]['x'], landmarks[13]['y']])
-                right_elbow = np.array([landmarks[14]['x'], landmarks[14]['y']])
-                
-                # Calculate angles
-                left_arm_angle = self.calculate_angle(left_shoulder, left_elbow, 
-                                                    np.array([landmarks[15]['x'], landmarks[15]['y']]))
-                right_arm_angle = self.calculate_angle(right_shoulder, right_elbow,
-                                                     np.array([landmarks[16]['x'], landmarks[16]['y']]))
-                
-                # Hip and leg angles
-                left_hip = np.array([landmarks[23]['x'], landmarks[23]['y']])
-                right_hip = np.array([landmarks[24]['x'], landmarks[24]['y']])
-                left_knee = np.array([landmarks[25]['x'], landmarks[25]['y']])
-                right_knee = np.array([landmarks[26]['x'], landmarks[26]['y']])
-                
-                left_leg_angle = self.calculate_angle(left_hip, left_knee,
-                                                    np.array([landmarks[27]['x'], landmarks[27]['y']]))
-                right_leg_angle = self.calculate_angle(right_hip, right_knee,
-                                                     np.array([landmarks[28]['x'], landmarks[28]['y']]))
-                
-                # Body center and stance
-                body_center_x = (left_hip[0] + right_hip[0]) / 2
-                body_center_y = (left_hip[1] + right_hip[1]) / 2
-                
-                frame_features.extend([
-                    left_arm_angle, right_arm_angle,
-                    left_leg_angle, right_leg_angle,
-                    body_center_x, body_center_y,
-                    landmarks[15]['x'] - landmarks[16]['x'],  # Hand separation
-                    landmarks[27]['x'] - landmarks[28]['x'],  # Foot separation
-                ])
-            
-            features.append(frame_features)
+        # Body center and stance
+        body_center = landmarks[:, [23, 24], :2].mean(axis=1)
         
-        # Aggregate features across frames
-        if features:
-            features_array = np.array(features)
-            # Use statistical measures across time
-            aggregated_features = np.concatenate([
-                np.mean(features_array, axis=0),
-                np.std(features_array, axis=0),
-                np.max(features_array, axis=0),
-                np.min(features_array, axis=0)
-            ])
-            return aggregated_features
+        features_array = np.column_stack([
+            angles,
+            body_center,
+            landmarks[:, 15, 0] - landmarks[:, 16, 0],  # Hand separation
+            landmarks[:, 27, 0] - landmarks[:, 28, 0],  # Foot separation
+        ])
         
-        return np.array([])
+        # Aggregate features across frames using statistical measures across time
+        return np.concatenate([
+            np.mean(features_array, axis=0),
+            np.std(features_array, axis=0),
+            np.max(features_array, axis=0),
+            np.min(features_array, axis=0)
+        ])
     
     def calculate_angle(self, point1: np.ndarray, point2: np.ndarray, point3: np.ndarray) -> float:
         """Calculate angle between three points"""
@@ -104,6 +76,8 @@ class TechniqueClassifier:
         y = []
         
         for pose_sequence, technique_label in training_data:
+            # Southpaw samples are mirrored so both stances share one feature layout
+            pose_sequence, _ = self.stance_normalizer.normalize(pose_sequence)
             features = self.extract_features(pose_sequence)
             if len(features) > 0:
                 X.append(features)
@@ -127,7 +101,7 @@ class TechniqueClassifier:
         return False
     
     def predict_technique(self, pose_sequence: List[Dict]) -> Tuple[str, float]:
-        """Predict technique from pose sequence"""
+        """Predict technique from a pose sequence already normalized by StanceNormalizer"""
         features = self.extract_features(pose_sequence)
         
         if len(features) > 0: